@@ -0,0 +1,205 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# gArtLc artifact layout: positions within each raw artifact list
+ARTIFACT_ID = 0
+ARTIFACT_TITLE = 1
+ARTIFACT_TYPE = 2
+ARTIFACT_SOURCES = 3  # [[[source_id]], ...]
+ARTIFACT_STATUS = 4
+ARTIFACT_TIMESTAMP = 10  # [seconds, nanos]
+ARTIFACT_CONTENT = 14
+
+# Values of the status field
+STATUS_RUNNING = 1
+STATUS_DONE = 3
+
+# gArtLc filter values: artifact.status enum name of items NotebookLM merely suggests
+STATUS_SUGGESTED_NAME = "ARTIFACT_STATUS_SUGGESTED"
+
+_UUID = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+# A JSON string whose whole value is a UUID
+_UUID_VALUE_RE = re.compile('"(' + _UUID + ')"')
+# The same, also matching inside JSON-encoded strings nested in a payload (\"...\")
+_NESTED_UUID_VALUE_RE = re.compile('(?<=")' + _UUID + r'(?=\\*")')
+
+
+def is_uuid(value: Any) -> bool:
+    # Dash layout only: cheap enough to run on every field of every poll
+    return (isinstance(value, str) and len(value) == 36 and value.count('-') == 4
+            and value[8] == value[13] == value[18] == value[23] == '-')
+
+
+def find_uuid(obj: Any) -> Optional[str]:
+    """
+    First UUID-valued string in a decoded payload, in document order, including ones
+    inside nested JSON strings. One regex pass over the serialized payload replaces
+    walking the tree and re-parsing every nested string.
+    """
+    if is_uuid(obj):
+        return obj
+    text = obj if isinstance(obj, str) else json.dumps(obj)
+    m = _NESTED_UUID_VALUE_RE.search(text)
+    return m.group(0) if m else None
+
+
+def _uuid_values(obj: Any) -> List[str]:
+    return _UUID_VALUE_RE.findall(json.dumps(obj))
+
+
+def _source_refs(refs: list) -> List[str]:
+    # [[[source_id]], ...]; anything shaped differently falls back to a scan
+    found = []
+    for ref in refs:
+        while isinstance(ref, list) and ref:
+            ref = ref[0]
+        if not is_uuid(ref):
+            return _uuid_values(refs)
+        found.append(ref)
+    return found
+
+
+def _is_artifact(item: Any) -> bool:
+    # A generated artifact: its own ID, a type, and references to the sources it was made from
+    return (isinstance(item, list) and len(item) > ARTIFACT_SOURCES
+            and is_uuid(item[ARTIFACT_ID]) and isinstance(item[ARTIFACT_TYPE], int)
+            and isinstance(item[ARTIFACT_SOURCES], list) and len(item[ARTIFACT_SOURCES]) > 0)
+
+
+class Artifact:
+    """One gArtLc artifact with its positional fields read once. `raw` keeps the original list."""
+
+    __slots__ = ("id", "title", "type_id", "status", "timestamp", "content", "raw")
+
+    def __init__(self, raw: list):
+        n = len(raw)
+        self.raw = raw
+        self.id: Any = raw[ARTIFACT_ID]
+        self.title: Any = raw[ARTIFACT_TITLE] if n > ARTIFACT_TITLE else None
+        self.type_id: Any = raw[ARTIFACT_TYPE] if n > ARTIFACT_TYPE else None
+        self.status: Any = raw[ARTIFACT_STATUS] if n > ARTIFACT_STATUS else None
+        self.content: Any = raw[ARTIFACT_CONTENT] if n > ARTIFACT_CONTENT else None
+
+        timestamp = raw[ARTIFACT_TIMESTAMP] if n > ARTIFACT_TIMESTAMP else None
+        self.timestamp = timestamp[0] if isinstance(timestamp, list) and timestamp else 0
+
+    def __repr__(self) -> str:
+        return f"Artifact(id={self.id!r}, type_id={self.type_id!r}, status={self.status!r})"
+
+
+class ArtifactIndex:
+    """
+    Lookup tables over one artifacts snapshot: by artifact/operation ID, and by tool
+    type ID with the newest artifact first. Built once per snapshot so each poll's
+    lookups are dict hits instead of list scans.
+
+    The same pass collects `source_ids`. In an artifact they are read from the
+    sources field only, so artifact IDs are never mistaken for sources; entries that
+    are not artifacts contribute every UUID they contain.
+    """
+
+    __slots__ = ("source", "by_id", "by_type", "source_ids")
+
+    def __init__(self, artifacts: list):
+        self.source = artifacts
+        self.by_id: Dict[Any, Artifact] = {}
+        self.by_type: Dict[Any, List[Artifact]] = {}
+        self.source_ids: List[str] = []
+        seen = set()
+
+        for raw in artifacts:
+            if _is_artifact(raw):
+                found = _source_refs(raw[ARTIFACT_SOURCES])
+            elif is_uuid(raw):
+                found = [raw]
+            else:
+                found = _uuid_values(raw)
+            for source_id in found:
+                if source_id not in seen:
+                    seen.add(source_id)
+                    self.source_ids.append(source_id)
+
+            if not isinstance(raw, list) or not raw:
+                continue
+            artifact = Artifact(raw)
+            # First occurrence wins, as with a front-to-back scan
+            self.by_id.setdefault(artifact.id, artifact)
+            if artifact.type_id is not None:
+                self.by_type.setdefault(artifact.type_id, []).append(artifact)
+
+        for same_type in self.by_type.values():
+            # Stable, so artifacts with equal timestamps keep their listing order
+            same_type.sort(key=lambda a: a.timestamp, reverse=True)
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        return self.by_id.get(artifact_id)
+
+    def latest(self, type_id: int) -> Optional[Artifact]:
+        same_type = self.by_type.get(type_id)
+        return same_type[0] if same_type else None
+
+    def of_type(self, type_id: int) -> List[Artifact]:
+        """Artifacts of a type, newest first."""
+        return self.by_type.get(type_id, [])
+
+
+class ArtifactQuery:
+    """
+    What a gArtLc call should return, rendered as the request's filter expression
+    (the syntax the NotebookLM web app sends, e.g. `NOT artifact.status = "..."`).
+
+        ArtifactQuery()                      # everything but suggestions
+        ArtifactQuery(types=[7])             # infographics only
+        ArtifactQuery(exclude_statuses=())   # no filter at all
+
+    `statuses` and `exclude_statuses` are artifact.status enum names; `types` are tool
+    type IDs (see TOOL_IDS). Queries are immutable and hashable.
+    """
+
+    __slots__ = ("types", "statuses", "exclude_statuses")
+
+    def __init__(self, types=(), statuses=(), exclude_statuses=(STATUS_SUGGESTED_NAME,)):
+        self.types = tuple(sorted(set(types)))
+        self.statuses = tuple(sorted(set(statuses)))
+        self.exclude_statuses = tuple(sorted(set(exclude_statuses)))
+
+    @property
+    def filter(self) -> Optional[str]:
+        terms = [f'NOT artifact.status = "{status}"' for status in self.exclude_statuses]
+        if self.statuses:
+            terms.append(_any_of([f'artifact.status = "{status}"' for status in self.statuses]))
+        if self.types:
+            terms.append(_any_of([f"artifact.type = {type_id}" for type_id in self.types]))
+        return " AND ".join(terms) or None
+
+    def covers(self, other: "ArtifactQuery") -> bool:
+        """True if everything `other` selects is also selected by this query, so its results can answer `other`."""
+        return ((not self.types or (bool(other.types) and set(other.types) <= set(self.types)))
+                and (not self.statuses or (bool(other.statuses) and set(other.statuses) <= set(self.statuses)))
+                and set(self.exclude_statuses) <= set(other.exclude_statuses))
+
+    def matches_type(self, raw: Any) -> bool:
+        return isinstance(raw, list) and len(raw) > ARTIFACT_TYPE and raw[ARTIFACT_TYPE] in self.types
+
+    def _key(self) -> tuple:
+        return (self.types, self.statuses, self.exclude_statuses)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ArtifactQuery) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"ArtifactQuery({self.filter!r})"
+
+
+def _any_of(terms: List[str]) -> str:
+    return terms[0] if len(terms) == 1 else "(" + " OR ".join(terms) + ")"
+
+
+# Unfiltered: every artifact and suggestion in the notebook
+ALL_ARTIFACTS = ArtifactQuery(exclude_statuses=())
+# Generated artifacts of any type, without suggestions
+GENERATED_ARTIFACTS = ArtifactQuery()
@@ -0,0 +1,183 @@
+import codecs
+import json
+import re
+from typing import Any, Container, Iterable, Iterator, List, Optional, Tuple
+
+XSSI_PREFIX = ")]}'"
+
+_LENGTH_RE = re.compile(r'(\d+)\n')
+_JSON = json.JSONDecoder()
+
+# Corrupt chunks are skipped once this many characters past their declared length
+# have been buffered without the JSON value completing
+_RESYNC_SLACK = 4096
+
+
+class EnvelopeReader:
+    """
+    Incrementally decodes a batchexecute `rt=c` response body:
+
+        )]}'
+        <length>\\n<json array>\\n<length>\\n<json array>...
+
+    Iterating yields each top-level JSON array as soon as enough bytes have arrived,
+    reading from `byte_chunks` (e.g. response.iter_content()) only as needed. The
+    declared length is a hint (it counts UTF-16 units, not bytes), so values are
+    delimited by the JSON decoder itself. Bodies without length prefixes also parse.
+    """
+
+    def __init__(self, byte_chunks: Iterable[bytes]):
+        self._source = iter(byte_chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Appends the next piece of the body to the buffer. Returns False at end of stream."""
+        if self._eof:
+            return False
+        try:
+            data = next(self._source)
+        except StopIteration:
+            self._eof = True
+            self._buf += self._decoder.decode(b'', final=True)
+            return False
+
+        # Drop consumed text so the buffer stays proportional to one chunk
+        if self._pos > 65536:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += self._decoder.decode(data)
+        return True
+
+    def _skip_whitespace(self) -> bool:
+        """Advances past whitespace, reading more if needed. Returns False if the body is exhausted."""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return True
+            if not self._fill():
+                return self._pos < len(self._buf)
+
+    def _skip_line(self) -> bool:
+        while True:
+            newline = self._buf.find('\n', self._pos)
+            if newline >= 0:
+                self._pos = newline + 1
+                return True
+            if not self._fill():
+                self._pos = len(self._buf)
+                return False
+
+    def __iter__(self) -> Iterator[list]:
+        # XSSI guard
+        while len(self._buf) - self._pos < len(XSSI_PREFIX) and self._fill():
+            pass
+        if self._buf.startswith(XSSI_PREFIX, self._pos):
+            self._pos += len(XSSI_PREFIX)
+
+        while self._skip_whitespace():
+            # Optional length line. Make sure it is complete before matching.
+            expected = None
+            if self._buf[self._pos].isdigit():
+                while '\n' not in self._buf[self._pos:self._pos + 32] and self._fill():
+                    pass
+                m = _LENGTH_RE.match(self._buf, self._pos)
+                if m:
+                    expected = int(m.group(1))
+                    self._pos = m.end()
+                    if not self._skip_whitespace():
+                        return
+
+            value = self._decode_value(expected)
+            if value is _SKIP:
+                if not self._skip_line():
+                    return
+                continue
+            if isinstance(value, list):
+                yield value
+
+    def _decode_value(self, expected: Optional[int]) -> Any:
+        while True:
+            available = len(self._buf) - self._pos
+            if expected is None or available >= expected or self._eof:
+                try:
+                    value, end = _JSON.raw_decode(self._buf, self._pos)
+                    self._pos = end
+                    return value
+                except ValueError:
+                    if self._eof or (expected is not None and available > expected + _RESYNC_SLACK):
+                        return _SKIP
+            self._fill()
+
+
+_SKIP = object()
+
+
+def iter_entries(byte_chunks: Iterable[bytes]) -> Iterator[list]:
+    """Yields the entries (e.g. ["wrb.fr", rpc_id, payload, ...]) of every chunk in the envelope."""
+    for chunk in EnvelopeReader(byte_chunks):
+        for entry in chunk:
+            yield entry
+
+
+def match_call(entry: Any, calls: List[Tuple[str, Optional[str]]], pending: Optional[Container[int]] = None) -> int:
+    """
+    Returns the index of the (rpc_id, tag) call an entry answers, or -1.
+    A tag of None matches any entry for the rpc_id; entries without a tag match any call for it.
+    With `pending`, only those call indices are considered, so repeated untagged calls
+    to one rpc_id are answered in order.
+    """
+    if not isinstance(entry, list) or len(entry) < 3:
+        return -1
+    entry_tag = entry[6] if len(entry) > 6 else None
+    for i, (rpc_id, tag) in enumerate(calls):
+        if pending is not None and i not in pending:
+            continue
+        if entry[1] == rpc_id and (tag is None or entry_tag in (None, tag)):
+            return i
+    return -1
+
+
+def decode_payload(inner_payload: Optional[str]) -> Tuple[bool, list]:
+    """Decodes one entry's inner JSON payload into the list shape _execute_rpc returns."""
+    if inner_payload is None:
+        return False, []
+    try:
+        data = json.loads(inner_payload)
+    except ValueError:
+        return True, []
+    if isinstance(data, list):
+        return True, data
+    # RPCs usually return lists of items; anything else is wrapped
+    return True, [data]
+
+
+def read_rpc_results(byte_chunks: Iterable[bytes], calls: List[Tuple[str, Optional[str]]]) -> List[Tuple[bool, list]]:
+    """
+    Streams an envelope and returns (found, results) per call. Only the payloads of
+    matching entries are decoded, and parsing stops once every call has been answered;
+    the rest of the body is drained undecoded so the connection can be reused.
+    """
+    results: List[Tuple[bool, list]] = [(False, []) for _ in calls]
+    pending = set(range(len(calls)))
+    source = iter(byte_chunks)
+
+    for entry in iter_entries(source):
+        i = match_call(entry, calls, pending)
+        if i < 0:
+            continue
+        found, data = decode_payload(entry[2])
+        if found:
+            results[i] = (True, data)
+            pending.discard(i)
+            if not pending:
+                break
+
+    for _ in source:
+        pass
+    return results
@@ -0,0 +1,193 @@
+"""
+Offline micro-benchmarks for the client's CPU hot paths: envelope parsing, RPC
+demultiplexing, UUID scanning, artifact flattening and lookups, and f.req encoding. Inputs are
+synthetic batchexecute responses of increasing size; nothing touches the network.
+
+    python bench.py                                  # print timings
+    python bench.py --save bench-baseline.json       # keep results for later runs
+    python bench.py --compare bench-baseline.json --fail-over 1.25
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import timeit
+import uuid
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from notebooklm_client import DEFAULT_BL, TOOL_IDS, NotebookLMClient
+
+DEFAULT_SIZES = [10, 100, 1000]
+NOTEBOOK_ID = "00000000-0000-4000-8000-000000000000"
+IMAGE_URL = "https://lh3.googleusercontent.com/notebooklm/" + "x" * 120
+
+
+def _uuid(i: int, kind: int = 0) -> str:
+    return str(uuid.UUID(int=(kind << 64) | i, version=4))
+
+
+def make_artifacts(n: int, sources: int = 3) -> list:
+    """n gArtLc-shaped artifacts over `sources` sources, cycling through every tool type."""
+    source_ids = [_uuid(i, kind=1) for i in range(sources)]
+    type_ids = list(TOOL_IDS.values())
+    artifacts = []
+    for i in range(n):
+        type_id = type_ids[i % len(type_ids)]
+        content = [None, None, [[None, [IMAGE_URL]]]] if type_id == 7 else [[f"Generated text {i} " * 8]]
+        artifacts.append([
+            _uuid(i, kind=2), f"Artifact {i}", type_id, [[[sid]] for sid in source_ids],
+            3 if i % 4 else 1, None, None, None, None, None, [1760000000 + i, 0],
+            None, None, None, content,
+        ])
+    return artifacts
+
+
+def make_add_source_response(n: int) -> list:
+    """izAoDd-shaped response whose only UUID comes after n metadata blocks, some holding nested JSON strings."""
+    blocks = [[f"Video title {i}", [i, i * 2, None], json.dumps([i, "meta", [None, True]])] for i in range(n)]
+    return [blocks, [[[_uuid(n, kind=1)], "Video title", [None, 1]]]]
+
+
+def make_envelope(entries: List[Tuple[str, object, str]]) -> bytes:
+    """Encodes (rpc_id, payload, tag) entries as an rt=c response body, with the usual trailing chunks."""
+    chunks = [[["wrb.fr", rpc_id, json.dumps(payload), None, None, None, tag]] for rpc_id, payload, tag in entries]
+    chunks.append([["di", 117], ["af.httprm", 116, "-1234567890", 12]])
+    parts = [")]}'\n"]
+    for chunk in chunks:
+        text = json.dumps(chunk)
+        parts.append(f"\n{len(text)}\n{text}")
+    return "".join(parts).encode("utf-8")
+
+
+class _Response:
+    """Stands in for a streamed requests.Response."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def iter_content(self, chunk_size: int = 16 * 1024) -> Iterator[bytes]:
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _client(body: bytes = b"") -> NotebookLMClient:
+    client = NotebookLMClient(f_sid="bench", bl=DEFAULT_BL, at_token="bench")
+    client.current_notebook_id = NOTEBOOK_ID
+    client._post_batchexecute = lambda rpc_ids, f_req, stream=False: _Response(body)
+    return client
+
+
+def _poll_lookups(client: NotebookLMClient, artifacts_resp: list, operation_id: str):
+    artifacts = client._store_artifacts(NOTEBOOK_ID, 0.0, artifacts_resp)
+    client._operation_status(artifacts, operation_id)
+    for tool_type in TOOL_IDS:
+        client._artifact_data(artifacts, tool_type)
+
+
+def build_cases(size: int) -> Dict[str, Callable[[], object]]:
+    artifacts = make_artifacts(size)
+    artifacts_resp = [artifacts]
+    gartlc_body = make_envelope([("gArtLc", artifacts_resp, "generic")])
+
+    # Batched polls of three notebooks, answered out of order
+    batch_body = make_envelope([("gArtLc", artifacts_resp, tag) for tag in ("3", "1", "2")])
+    batch_calls = [("gArtLc", [[2], NOTEBOOK_ID, None])] * 3
+
+    source_ids = [_uuid(i, kind=1) for i in range(size)]
+    add_source_resp = make_add_source_response(size)
+
+    client = _client(gartlc_body)
+    batch_client = _client(batch_body)
+
+    return {
+        "parse_envelope": lambda: client._parse_envelope(gartlc_body),
+        "execute_rpc": lambda: client._execute_rpc("gArtLc", [[2], NOTEBOOK_ID, None]),
+        "execute_batch": lambda: batch_client._execute_batch(batch_calls),
+        "find_uuid": lambda: client._find_uuid(add_source_resp),
+        # A fresh snapshot each call, so the per-snapshot index is rebuilt as in a real poll
+        "get_sources": lambda: client._source_ids(client._store_artifacts(NOTEBOOK_ID, 0.0, artifacts_resp)),
+        "store_artifacts": lambda: client._store_artifacts(NOTEBOOK_ID, 0.0, artifacts_resp),
+        # One poll tick: a fresh snapshot, then the status and result lookups made against it
+        "poll_lookups": lambda: _poll_lookups(client, artifacts_resp, artifacts[-1][0]),
+        "encode_f_req": lambda: client._encode_f_req([("R7cb6c", client._tool_payload("infographic", source_ids))]),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Best time per call in seconds over `repeat` runs of an auto-sized loop."""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=loops)) / loops
+
+
+def run(sizes: List[int], repeat: int, only: List[str]) -> Dict[str, float]:
+    results = {}
+    for size in sizes:
+        for name, fn in build_cases(size).items():
+            if only and name not in only:
+                continue
+            key = f"{name}/{size}"
+            results[key] = measure(fn, repeat)
+            print(f"{key:<24} {results[key] * 1e6:>12.1f} us", flush=True)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], fail_over: float) -> List[str]:
+    """Prints the ratio to the baseline per case and returns the cases slower than fail_over."""
+    regressions = []
+    print(f"\n{'case':<24} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key, current in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        ratio = current / before
+        flag = ""
+        if fail_over and ratio > fail_over:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<24} {before * 1e6:>10.1f}us {current * 1e6:>10.1f}us {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for the NotebookLM client")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Artifacts per synthetic response")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", default=[], help="Run only these cases")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against results saved by --save")
+    parser.add_argument("--fail-over", type=float, default=0.0,
+                        help="With --compare, exit 1 if any case is slower than this ratio (e.g. 1.25)")
+    args = parser.parse_args()
+
+    # Keep client diagnostics out of the measurements
+    logging.disable(logging.WARNING)
+
+    results = run(args.sizes, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.time(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.fail_over)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed beyond {args.fail_over}x: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,8 +22,13 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
         chrome.action.enable(tabId);
 
         console.log('Enabled action for tab:', tabId, message.url);
+        schedulePrewarm(tabId, message.url);
         sendResponse({ status: 'enabled' });
 
+    } else if (message.type === 'YOUTUBE_INACTIVE') {
+        schedulePrewarm(sender.tab.id, null);
+        sendResponse({ status: 'ok' });
+
     } else if (message.type === 'GENERATE_INFOGRAPHIC') {
         handleGenerateInfographic(message.url, sendResponse);
         return true; // Keep the message channel open for async response
@@ -74,6 +79,82 @@ async function updateState(videoId, newState) {
     await chrome.storage.local.set({ infographicStates: states });
 }
 
+const BACKEND_BASE = 'http://localhost:8000';
+const JOB_POLL_INTERVAL_MS = 2000;
+// A video must stay open this long before the backend starts ingesting it speculatively
+const PREWARM_DELAY_MS = 8000;
+
+// tabId -> { videoId, timer } for the video each tab is prewarming (or about to)
+const tabPrewarms = new Map();
+
+// Called whenever a tab's video changes (url is null when it left the video). Cancels the
+// previous video's prewarm and, after PREWARM_DELAY_MS, asks the backend to prewarm the new one.
+function schedulePrewarm(tabId, url) {
+    const videoId = url ? extractVideoId(url) : null;
+    const previous = tabPrewarms.get(tabId);
+    if (previous && previous.videoId === videoId) return;
+
+    if (previous) {
+        clearTimeout(previous.timer);
+        tabPrewarms.delete(tabId);
+        cancelPrewarm(previous.videoId);
+    }
+    if (!videoId) return;
+
+    const timer = setTimeout(async () => {
+        const storage = await chrome.storage.local.get(['auth']);
+        const auth = storage.auth;
+        if (!auth || !auth.cookie || !auth.at_token) return;
+        try {
+            const response = await fetch(`${BACKEND_BASE}/prewarm`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    youtube_url: url,
+                    auth: { cookie: auth.cookie, at_token: auth.at_token }
+                })
+            });
+            console.log('Prewarm', videoId, response.ok ? (await response.json()).status : response.status);
+        } catch (e) {
+            // The backend may not be running; prewarming is best effort
+        }
+    }, PREWARM_DELAY_MS);
+    tabPrewarms.set(tabId, { videoId: videoId, timer: timer });
+}
+
+function cancelPrewarm(videoId) {
+    // Another tab may still be showing the video
+    for (const entry of tabPrewarms.values()) {
+        if (entry.videoId === videoId) return;
+    }
+    fetch(`${BACKEND_BASE}/prewarm/${encodeURIComponent(videoId)}`, { method: 'DELETE' }).catch(() => { });
+}
+
+chrome.tabs.onRemoved.addListener((tabId) => {
+    schedulePrewarm(tabId, null);
+});
+
+// Polls a backend job until it reaches a terminal stage, reporting stage changes.
+async function pollJob(statusUrl, onStage) {
+    let lastStage = null;
+    while (true) {
+        const response = await fetch(`${BACKEND_BASE}${statusUrl}`);
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(`Backend error: ${response.status} ${errorText}`);
+        }
+        const job = await response.json();
+        if (job.stage !== lastStage) {
+            lastStage = job.stage;
+            onStage(job.stage);
+        }
+        if (job.stage === 'done' || job.stage === 'failed') {
+            return job;
+        }
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
 async function handleGenerateInfographic(url, sendResponse) {
     const videoId = extractVideoId(url);
     if (!videoId) {
@@ -99,7 +180,9 @@ async function handleGenerateInfographic(url, sendResponse) {
         });
         broadcastStatus(url, 'RUNNING');
 
-        const backendUrl = 'http://localhost:8000/generate-infographic';
+        // Start a background job, then poll its status so no single request
+        // has to stay open for the whole generation.
+        const backendUrl = `${BACKEND_BASE}/jobs`;
         console.log(`Sending request to backend: ${backendUrl} with url: ${url}`);
 
         const response = await fetch(backendUrl, {
@@ -130,16 +213,30 @@ async function handleGenerateInfographic(url, sendResponse) {
             throw new Error(`Backend error: ${response.status} ${errorText}`);
         }
 
-        const data = await response.json();
+        const job = await response.json();
+        console.log('Backend job:', job);
+
+        const finalJob = await pollJob(job.status_url, (stage) => {
+            broadcastStatus(url, 'RUNNING', { stage: stage });
+        });
+
+        if (finalJob.stage === 'failed') {
+            throw new Error(finalJob.error || 'Generation failed');
+        }
+
+        const data = { image_url: finalJob.result };
         console.log('Backend response:', data);
 
         if (data.image_url) {
+            // Shown from the backend's image cache; the Google URL is the fallback
+            const localImageUrl = `${BACKEND_BASE}/artifacts/${videoId}/image`;
             await updateState(videoId, {
                 status: 'COMPLETED',
-                image_url: data.image_url
+                image_url: localImageUrl,
+                remote_image_url: data.image_url
             });
-            broadcastStatus(url, 'COMPLETED', { image_url: data.image_url });
-            sendResponse({ success: true, imageUrl: data.image_url });
+            broadcastStatus(url, 'COMPLETED', { image_url: localImageUrl, remote_image_url: data.image_url });
+            sendResponse({ success: true, imageUrl: localImageUrl, remoteImageUrl: data.image_url });
         } else {
             const err = 'No image URL returned from backend.';
             await updateState(videoId, {
@@ -36,6 +36,9 @@ function detectAndSendUrl() {
     if (isYouTubeVideo(url)) {
         console.log('YouTube video detected:', url);
         chrome.runtime.sendMessage({ type: 'YOUTUBE_ACTIVE', url: url });
+    } else {
+        // Lets the background cancel the speculative ingestion of the video we left
+        chrome.runtime.sendMessage({ type: 'YOUTUBE_INACTIVE' });
     }
 }
 
@@ -399,7 +402,7 @@ function getOrCreateUI() {
     return container;
 }
 
-function updateUI(status, imageUrl = null, errorMessage = null) {
+function updateUI(status, imageUrl = null, errorMessage = null, remoteImageUrl = null) {
     const container = getOrCreateUI();
     const statusEl = document.getElementById(UI_CONTAINER_ID + '-status');
     const authContainer = document.getElementById(UI_CONTAINER_ID + '-auth-container');
@@ -455,7 +458,14 @@ function updateUI(status, imageUrl = null, errorMessage = null) {
     if (status === 'COMPLETED' && imageUrl) {
         imgPreview.src = imageUrl;
         imgPreview.style.display = 'block';
-        imgPreview.onclick = () => window.open(imageUrl, '_blank');
+        imgPreview.onclick = () => window.open(imgPreview.src, '_blank');
+        // Fall back to Google's copy if the local backend cannot serve the image
+        imgPreview.onerror = () => {
+            if (remoteImageUrl && imgPreview.src !== remoteImageUrl) {
+                imgPreview.src = remoteImageUrl;
+                link.href = remoteImageUrl;
+            }
+        };
 
         link.href = imageUrl;
         link.style.display = 'block';
@@ -475,7 +485,7 @@ function restoreStateForCurrentVideo() {
         const state = states[videoId];
 
         if (state) {
-            updateUI(state.status, state.image_url, state.error);
+            updateUI(state.status, state.image_url, state.error, state.remote_image_url);
         } else {
             updateUI('IDLE');
         }
@@ -487,7 +497,7 @@ chrome.runtime.onMessage.addListener((message) => {
     if (message.type === 'INFOGRAPHIC_UPDATE') {
         const currentVideoId = extractVideoId(window.location.href);
         if (currentVideoId && message.videoId === currentVideoId) {
-            updateUI(message.status, message.image_url, message.error);
+            updateUI(message.status, message.image_url, message.error, message.remote_image_url);
         }
     } else if (message.type === 'AUTH_EXPIRED') {
         updateUI('AUTH_REQUIRED');
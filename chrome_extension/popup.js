@@ -51,10 +51,7 @@ document.addEventListener('DOMContentLoaded', () => {
         } else if (state.status === 'COMPLETED') {
             loadingDiv.classList.add('hidden');
             statusMessage.textContent = 'Infographic Generated!';
-            infographicImage.src = state.image_url;
-            infographicImage.style.display = 'block';
-
-            downloadLink.href = state.image_url;
+            showImage(state.image_url, state.remote_image_url);
             downloadLink.classList.remove('hidden');
 
             generateBtn.textContent = 'Generate Again';
@@ -92,10 +89,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
             if (response && response.success) {
                 statusMessage.textContent = 'Infographic Generated!';
-                infographicImage.src = response.imageUrl;
-                infographicImage.style.display = 'block';
-
-                downloadLink.href = response.imageUrl;
+                showImage(response.imageUrl, response.remoteImageUrl);
                 downloadLink.classList.remove('hidden');
 
                 // Keep button hidden or show "Generate Again"?
@@ -111,6 +105,20 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    function showImage(imageUrl, remoteImageUrl) {
+        // Fall back to Google's copy if the local backend cannot serve the image
+        infographicImage.onerror = () => {
+            if (remoteImageUrl && infographicImage.src !== remoteImageUrl) {
+                infographicImage.src = remoteImageUrl;
+                downloadLink.href = remoteImageUrl;
+            }
+        };
+        infographicImage.src = imageUrl;
+        infographicImage.style.display = 'block';
+
+        downloadLink.href = imageUrl;
+    }
+
     function showError(msg) {
         errorMessage.textContent = msg;
         errorMessage.classList.remove('hidden');
@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from notebooklm_client import NotebookLMClient
+from rate_limiter import RateLimiter
+
+
+class _Account:
+    """Cached session params and idle clients for one cookie/at_token pair."""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None):
+        self.limiter = limiter
+        self.f_sid: Optional[str] = None
+        self.bl: Optional[str] = None
+        self.params_fetched_at = 0.0
+        self.idle: List[NotebookLMClient] = []
+
+
+class ClientPool:
+    """
+    Pool of NotebookLMClient instances keyed by credentials.
+
+    A client is checked out exclusively for the duration of a request (it carries
+    per-notebook state), then returned so the next request from the same browser
+    reuses its warm requests.Session. The f.sid / bl values scraped from the
+    homepage are cached per account for `params_ttl` seconds, so new clients for a
+    known account skip the homepage fetch. Accounts are evicted least recently used.
+
+    With `rpc_rate` set, every client of an account shares one RateLimiter allowing
+    that many batchexecute calls per second (bursts up to `rpc_burst`).
+    """
+
+    def __init__(self, max_accounts: int = 32, max_idle_per_account: int = 4, params_ttl: float = 1800,
+                 rpc_rate: float = 0, rpc_burst: float = 5):
+        self.max_accounts = max_accounts
+        self.max_idle_per_account = max_idle_per_account
+        self.params_ttl = params_ttl
+        self.rpc_rate = rpc_rate
+        self.rpc_burst = rpc_burst
+        self._accounts: "OrderedDict[str, _Account]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def account_key(headers: Dict, at_token: Optional[str]) -> str:
+        raw = f"{headers.get('cookie') or ''}\0{at_token or ''}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def acquire(self, headers: Dict, at_token: Optional[str]) -> NotebookLMClient:
+        key = self.account_key(headers, at_token)
+        now = time.time()
+
+        with self._lock:
+            account = self._accounts.get(key)
+            if account is None:
+                account = _Account(RateLimiter(self.rpc_rate, self.rpc_burst) if self.rpc_rate > 0 else None)
+                self._accounts[key] = account
+                self._evict_locked()
+            self._accounts.move_to_end(key)
+
+            params_fresh = account.f_sid and now - account.params_fetched_at < self.params_ttl
+            if params_fresh and account.idle:
+                client = account.idle.pop()
+                client.current_notebook_id = None
+                client.rate_limiter = account.limiter
+                client._pool_key = key
+                return client
+            f_sid, bl = (account.f_sid, account.bl) if params_fresh else (None, None)
+
+        # Build outside the lock: a cold client fetches the homepage
+        client = NotebookLMClient(headers=headers, at_token=at_token, f_sid=f_sid, bl=bl,
+                                  rate_limiter=account.limiter)
+        client._pool_key = key
+
+        if not params_fresh and client.f_sid:
+            with self._lock:
+                account.f_sid, account.bl = client.f_sid, client.bl
+                account.params_fetched_at = time.time()
+                # Idle clients hold stale params now
+                for stale in account.idle:
+                    stale.session.close()
+                account.idle = []
+        return client
+
+    def release(self, client: NotebookLMClient, discard: bool = False):
+        key = getattr(client, "_pool_key", None)
+        with self._lock:
+            account = self._accounts.get(key) if key else None
+            if discard or account is None or len(account.idle) >= self.max_idle_per_account \
+                    or client.f_sid != account.f_sid:
+                client.session.close()
+                return
+            client.current_notebook_id = None
+            account.idle.append(client)
+
+    @contextmanager
+    def client(self, headers: Dict, at_token: Optional[str]) -> Iterator[NotebookLMClient]:
+        client = self.acquire(headers, at_token)
+        try:
+            yield client
+        except Exception:
+            # Don't hand a session in an unknown state to the next request
+            self.release(client, discard=True)
+            raise
+        else:
+            self.release(client)
+
+    def invalidate(self, headers: Dict, at_token: Optional[str]):
+        """Drop cached params and idle clients for an account (e.g. after an auth failure)."""
+        key = self.account_key(headers, at_token)
+        with self._lock:
+            account = self._accounts.pop(key, None)
+        if account:
+            for client in account.idle:
+                client.session.close()
+
+    def _evict_locked(self):
+        while len(self._accounts) > self.max_accounts:
+            _, account = self._accounts.popitem(last=False)
+            for client in account.idle:
+                client.session.close()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+from singleflight import SingleFlight
+
+# Largest image accepted from upstream
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+
+class CachedImage:
+    """A cached image file. `digest` (sha256 of the body) doubles as its ETag."""
+
+    __slots__ = ("path", "digest", "content_type", "size", "fetched_at")
+
+    def __init__(self, path: str, digest: str, content_type: str, size: int, fetched_at: float):
+        self.path = path
+        self.digest = digest
+        self.content_type = content_type
+        self.size = size
+        self.fetched_at = fetched_at
+
+
+class ImageCache:
+    """
+    On-disk cache of generated images, so repeat views are served locally instead of
+    downloaded from Google again.
+
+    Bodies are stored content-addressed under blobs/ (identical images share one file);
+    refs/{video_id}.json maps a video to the URL it was fetched from and the blob's
+    digest. A ref whose URL no longer matches is refetched. Each hit touches the blob,
+    and after each fetch the least recently used blobs are evicted until the cache holds
+    at most `max_entries` blobs and `max_bytes` bytes.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000, max_bytes: int = 200 * 1024 * 1024,
+                 timeout: float = 30, headers: Optional[Dict] = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._blobs = os.path.join(directory, "blobs")
+        self._refs = os.path.join(directory, "refs")
+        self._lock = threading.Lock()
+        # Concurrent misses for the same video share one download
+        self._inflight = SingleFlight()
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._refs, exist_ok=True)
+
+    def _ref_path(self, video_id: str) -> str:
+        return os.path.join(self._refs, f"{video_id}.json")
+
+    def get(self, video_id: str, url: Optional[str] = None) -> Optional[CachedImage]:
+        """
+        The cached image for video_id, downloading it from `url` on a miss or when the
+        cached copy came from a different URL. Without a URL only the cache is consulted.
+        Raises if the download fails.
+        """
+        cached = self._lookup(video_id, url)
+        if cached is not None or not url:
+            return cached
+        image, _ = self._inflight.do(video_id, lambda: self._lookup(video_id, url) or self._fetch(video_id, url))
+        return image
+
+    def _lookup(self, video_id: str, url: Optional[str]) -> Optional[CachedImage]:
+        try:
+            with open(self._ref_path(video_id), 'r', encoding='utf-8') as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if url and ref.get("url") != url:
+            return None
+
+        path = os.path.join(self._blobs, ref.get("blob", ""))
+        try:
+            size = os.stat(path).st_size
+            # Blob mtime is the LRU clock; fetched_at stays fixed for Last-Modified
+            os.utime(path)
+        except OSError:
+            return None
+        return CachedImage(path, ref["digest"], ref["content_type"], size, ref["fetched_at"])
+
+    def _fetch(self, video_id: str, url: str) -> CachedImage:
+        response = requests.get(url, headers=self.headers, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code != 200:
+                raise Exception(f"Image fetch failed: HTTP {response.status_code}")
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if not content_type.startswith("image/"):
+                raise Exception(f"Image fetch returned {content_type or 'no content type'}")
+
+            digest = hashlib.sha256()
+            fd, tmp_path = tempfile.mkstemp(dir=self._blobs, suffix=".tmp")
+            size = 0
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(64 * 1024):
+                        size += len(chunk)
+                        if size > MAX_IMAGE_BYTES:
+                            raise Exception(f"Image larger than {MAX_IMAGE_BYTES} bytes")
+                        digest.update(chunk)
+                        f.write(chunk)
+                blob = digest.hexdigest() + (mimetypes.guess_extension(content_type) or "")
+                os.replace(tmp_path, os.path.join(self._blobs, blob))
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+        finally:
+            response.close()
+
+        ref = {
+            "video_id": video_id,
+            "url": url,
+            "blob": blob,
+            "digest": digest.hexdigest(),
+            "content_type": content_type,
+            "fetched_at": time.time(),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self._refs, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(ref, f)
+            os.replace(tmp_path, self._ref_path(video_id))
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+        return CachedImage(os.path.join(self._blobs, blob), ref["digest"], content_type, size, ref["fetched_at"])
+
+    def _evict(self):
+        # Refs to evicted blobs are left in place; _lookup treats them as misses
+        with self._lock:
+            entries = []
+            for name in os.listdir(self._blobs):
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(self._blobs, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                total -= size
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
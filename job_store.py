@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    tool_type TEXT NOT NULL,
+    youtube_url TEXT,
+    stage TEXT NOT NULL,
+    notebook_id TEXT,
+    source_id TEXT,
+    operation_id TEXT,
+    deadline REAL,
+    result TEXT,
+    error TEXT,
+    auth TEXT,
+    events TEXT,
+    trace TEXT,
+    owner INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage ON jobs (stage);
+"""
+
+# An INSERT that conflicts with a job finishing at the same moment is retried this often
+INSERT_ATTEMPTS = 3
+
+# Columns added after the first schema, created on open if missing
+_MIGRATIONS = {"events": "TEXT", "owner": "INTEGER", "trace": "TEXT"}
+
+# Columns update() may set, and those stored as JSON
+_FIELDS = ("stage", "notebook_id", "source_id", "operation_id", "deadline", "result", "error", "auth", "events",
+           "trace")
+_JSON_FIELDS = ("result", "auth", "events", "trace")
+
+
+class JobStore:
+    """
+    Durable record of /jobs generations in a WAL-mode SQLite file, so a restarted
+    server can pick up where each job left off instead of generating it again.
+
+    A row holds the job's latest stage, its event history and timing trace, and the
+    upstream IDs reached so far (notebook, source, operation) with the tool's deadline.
+    The credentials needed to resume are kept only while the job is unfinished, and
+    the file is readable by its owner only.
+
+    Several server processes can share one store. Each unfinished job is owned by the
+    pid running it, and at most one unfinished job may exist per (video_id, tool_type).
+    """
+
+    def __init__(self, path: str, terminal_stages=("done", "failed")):
+        self.path = path
+        self.terminal_stages = tuple(terminal_stages)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Opened on first use by each process (see _connect)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._inherited: List[sqlite3.Connection] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per process, shared by its threads; sqlite3 calls are serialized by _lock.
+        # A connection must not be used across fork(), so a forked worker opens its own. The parent
+        # closes its connection before forking; one inherited anyway is kept referenced, since
+        # closing it here would drop the parent's SQLite locks.
+        if self._conn is not None:
+            if self._pid == os.getpid():
+                return self._conn
+            self._inherited.append(self._conn)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        try:
+            # The -wal and -shm files take the database file's permissions
+            os.chmod(self.path, 0o600)
+        except OSError:
+            pass
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps NORMAL durable across process crashes, which is what restarts need
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in _MIGRATIONS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        try:
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS jobs_active ON jobs (video_id, tool_type)"
+                         f" WHERE stage NOT IN ({self._terminal_list()})")
+        except sqlite3.IntegrityError:
+            # Duplicates left by an older version; they finish or get pruned, and the index is retried on the next open
+            pass
+        self._conn, self._pid = conn, os.getpid()
+        return conn
+
+    def _terminal_list(self) -> str:
+        # Stage names are internal constants, safe to inline (partial indexes cannot take parameters)
+        return ", ".join(f"'{stage}'" for stage in self.terminal_stages)
+
+    def insert(self, job_id: str, video_id: str, tool_type: str, stage: str, created_at: float,
+               youtube_url: Optional[str] = None, auth: Optional[Dict] = None, events: Optional[List] = None,
+               result: Any = None, owner: Optional[int] = None) -> Optional[str]:
+        """
+        Adds a job. Returns None, or, if another unfinished job for the same video and
+        tool exists (possibly in another process), that job's ID without adding this one.
+        """
+        with self._lock:
+            conn = self._connect()
+            for attempt in range(INSERT_ATTEMPTS):
+                try:
+                    conn.execute(
+                        "INSERT INTO jobs (id, video_id, tool_type, youtube_url, stage, auth, events, result, owner,"
+                        " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, video_id, tool_type, youtube_url, stage, json.dumps(auth) if auth else None,
+                         json.dumps(events or []), json.dumps(result) if result is not None else None, owner,
+                         created_at, time.time()))
+                    return None
+                except sqlite3.IntegrityError:
+                    row = conn.execute(
+                        f"SELECT id FROM jobs WHERE video_id = ? AND tool_type = ? AND stage NOT IN ({self._terminal_list()})",
+                        (video_id, tool_type)).fetchone()
+                    if row is not None:
+                        return row[0]
+                    # The conflicting job finished between the INSERT and the SELECT (or the
+                    # conflict was on the ID itself, and the last attempt re-raises)
+                    if attempt == INSERT_ATTEMPTS - 1:
+                        raise
+
+    def update(self, job_id: str, **fields: Any):
+        """Sets the given columns (`result`, `auth`, `events` and `trace` as JSON). A terminal stage drops the credentials."""
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        for name in _JSON_FIELDS:
+            if fields.get(name) is not None:
+                fields[name] = json.dumps(fields[name])
+        if fields.get("stage") in self.terminal_stages:
+            fields["auth"] = None
+
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._connect().execute(f"UPDATE jobs SET {columns}, updated_at = ? WHERE id = ?",
+                                    (*fields.values(), time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            cursor = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._row(cursor, row) if row else None
+
+    def pending(self) -> List[Dict]:
+        """Unfinished jobs, oldest first."""
+        with self._lock:
+            cursor = self._connect().execute(
+                f"SELECT * FROM jobs WHERE stage NOT IN ({self._terminal_list()}) ORDER BY created_at")
+            return [self._row(cursor, row) for row in cursor.fetchall()]
+
+    def claim(self, owner: int) -> List[Dict]:
+        """Takes ownership of every unfinished job without an owner and returns them, oldest first."""
+        with self._lock:
+            conn = self._connect()
+            # IMMEDIATE takes the write lock up front, so two processes cannot claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    f"SELECT * FROM jobs WHERE owner IS NULL AND stage NOT IN ({self._terminal_list()}) ORDER BY created_at")
+                records = [self._row(cursor, row) for row in cursor.fetchall()]
+                conn.executemany("UPDATE jobs SET owner = ? WHERE id = ?", [(owner, r["id"]) for r in records])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        for record in records:
+            record["owner"] = owner
+        return records
+
+    def release(self, owner: Optional[int] = None):
+        """Clears the owner of unfinished jobs (all of them, or those of one pid) so they can be claimed again."""
+        query = f"UPDATE jobs SET owner = NULL WHERE stage NOT IN ({self._terminal_list()})"
+        with self._lock:
+            if owner is None:
+                self._connect().execute(query)
+            else:
+                self._connect().execute(query + " AND owner = ?", (owner,))
+
+    def prune(self, max_age: float):
+        """Deletes finished jobs last updated more than max_age seconds ago."""
+        with self._lock:
+            self._connect().execute(f"DELETE FROM jobs WHERE stage IN ({self._terminal_list()}) AND updated_at < ?",
+                                    (time.time() - max_age,))
+
+    def close(self):
+        """Closes this process's connection; the next call opens a new one."""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+        record = {column[0]: value for column, value in zip(cursor.description, row)}
+        for name in _JSON_FIELDS:
+            if record.get(name) is not None:
+                record[name] = json.loads(record[name])
+        return record
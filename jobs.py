@@ -0,0 +1,318 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from job_store import JobStore
+from tracing import Trace, activate
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages, in the order they are reported
+STAGE_QUEUED = "queued"
+STAGE_STARTED = "started"
+STAGE_NOTEBOOK_CREATED = "notebook_created"
+STAGE_SOURCE_ADDED = "source_added"
+STAGE_TOOL_RUNNING = "tool_running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+TERMINAL_STAGES = (STAGE_DONE, STAGE_FAILED)
+
+# How often a job running in another process is re-read from the store while waiting for its events
+STORE_POLL_INTERVAL = 1.0
+
+
+class Job:
+    """
+    A background generation job, the ordered list of stage events it has emitted and
+    the timing spans (see tracing.py) recorded while it ran.
+    """
+
+    def __init__(self, key: Hashable, video_id: str, tool_type: str, job_id: Optional[str] = None,
+                 created_at: Optional[float] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.key = key
+        self.video_id = video_id
+        self.tool_type = tool_type
+        self.stage = STAGE_QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = created_at or time.time()
+        self.updated_at = self.created_at
+        self.events: List[Dict] = []
+        self.trace = Trace(started_at=self.created_at)
+        # Called as listener(job, stage, info) after each new stage, outside the job's lock
+        self.listener: Optional[Callable[["Job", str, Dict], None]] = None
+        self._cond = threading.Condition()
+        self._append_event(STAGE_QUEUED, {})
+
+    @classmethod
+    def from_record(cls, record: Dict) -> "Job":
+        """Rebuilds a job from its JobStore row, e.g. one run by another server process."""
+        video_id, tool_type = record["video_id"], record["tool_type"]
+        job = cls((video_id, tool_type), video_id, tool_type, job_id=record["id"], created_at=record["created_at"])
+        if record.get("events"):
+            job.events = list(record["events"])
+        elif record["stage"] != STAGE_QUEUED:
+            # Rows written before event history was stored
+            reached = {name: record[name] for name in ("notebook_id", "source_id", "operation_id") if record.get(name)}
+            job._append_event(record["stage"], reached)
+        if record.get("trace"):
+            job.trace = Trace.from_dict(record["trace"])
+        job.stage = record["stage"]
+        job.result = record.get("result")
+        job.error = record.get("error")
+        job.updated_at = record["updated_at"]
+        return job
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in TERMINAL_STAGES
+
+    def _append_event(self, stage: str, info: Dict):
+        self.stage = stage
+        self.updated_at = time.time()
+        self.events.append({"seq": len(self.events), "stage": stage, "time": self.updated_at, **info})
+
+    def _notify(self, stage: str, info: Dict):
+        if self.listener is not None:
+            try:
+                self.listener(self, stage, info)
+            except Exception as e:
+                logger.warning("Job %s listener failed: %s", self.id, e)
+
+    def report(self, stage: str, **info):
+        with self._cond:
+            if self.finished:
+                return
+            self._append_event(stage, info)
+            self._cond.notify_all()
+        self._notify(stage, info)
+
+    def succeed(self, result: Any):
+        with self._cond:
+            self.result = result
+            self._append_event(STAGE_DONE, {"result": result})
+            self._cond.notify_all()
+        self._notify(STAGE_DONE, {"result": result})
+
+    def fail(self, error: str):
+        with self._cond:
+            self.error = error
+            self._append_event(STAGE_FAILED, {"error": error})
+            self._cond.notify_all()
+        self._notify(STAGE_FAILED, {"error": error})
+
+    def wait_for_events(self, after_seq: int, timeout: float) -> List[Dict]:
+        """Blocks until there are events with seq > after_seq (or timeout) and returns them."""
+        with self._cond:
+            if len(self.events) <= after_seq + 1 and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[after_seq + 1:]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def to_dict(self) -> Dict:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "video_id": self.video_id,
+                "tool_type": self.tool_type,
+                "stage": self.stage,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "updated_at": self.updated_at,
+                "events": list(self.events),
+                "trace": self.trace.to_dict(),
+            }
+
+
+class JobManager:
+    """
+    Runs generation jobs on a background thread pool so HTTP handlers can return
+    immediately. Submitting a key that already has an unfinished job returns that
+    job instead of starting another. Finished jobs are kept for `retention` seconds.
+
+    With a JobStore, every job and its stages are also written to disk, and
+    `resume()` restarts the jobs a previous process left unfinished. Server processes
+    sharing the store see each other's jobs: `get()` falls back to the store, and a
+    submit for a key another process is running returns that job.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 256, retention: float = 3600,
+                 store: Optional[JobStore] = None):
+        self.max_pending = max_pending
+        self.retention = retention
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Hashable, Job] = {}
+        # Keys whose new job is being inserted into the store, which happens outside _lock;
+        # the event is set once the job is published to _active (or given up)
+        self._reserved: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, video_id: str, tool_type: str, fn: Callable[[Job], Any],
+               youtube_url: Optional[str] = None, auth: Optional[Dict] = None) -> Job:
+        """
+        Starts fn(job) in the background, or returns the unfinished job already running for key.
+        youtube_url and auth are persisted so the job can be resumed after a restart.
+        Raises OverflowError if too many jobs are waiting.
+        """
+        while True:
+            with self._lock:
+                self._prune_locked()
+                existing = self._active.get(key)
+                if existing is not None:
+                    return existing
+                reserved = self._reserved.get(key)
+                if reserved is None:
+                    if len(self._active) + len(self._reserved) >= self.max_pending:
+                        raise OverflowError("Too many pending jobs")
+                    job = Job(key, video_id, tool_type)
+                    if self.store is None:
+                        self._jobs[job.id] = job
+                        self._active[key] = job
+                    else:
+                        reserved = self._reserved[key] = threading.Event()
+                    break
+            # Another submit for this key is inserting its job; use that one once it is published
+            reserved.wait()
+
+        if self.store is not None:
+            # Outside _lock: an insert contending with other processes can wait out the busy timeout,
+            # and get() must not stall behind it
+            try:
+                other = self._insert(job, youtube_url, auth)
+                if other is not None:
+                    return other
+                job.listener = self._persist
+                with self._lock:
+                    self._jobs[job.id] = job
+                    self._active[key] = job
+            finally:
+                with self._lock:
+                    del self._reserved[key]
+                reserved.set()
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _insert(self, job: Job, youtube_url: Optional[str], auth: Optional[Dict]) -> Optional[Job]:
+        """Stores a new job. Returns None, or the unfinished job another process runs for the same key."""
+        # Retried once in case the other process's job is pruned before it can be read
+        for _ in range(2):
+            other_id = self.store.insert(job.id, job.video_id, job.tool_type, job.stage, job.created_at,
+                                         youtube_url=youtube_url, auth=auth, events=job.events, owner=os.getpid())
+            if other_id is None:
+                return None
+            record = self.store.get(other_id)
+            if record is not None:
+                return Job.from_record(record)
+        raise OverflowError("Job store busy, retry")
+
+    def resume(self, fn: Callable[[Job, Dict], Any]) -> List[Job]:
+        """
+        Claims every unfinished job in the store that no process owns (see
+        JobStore.release) and restarts it as fn(job, record), where record is the stored
+        row (notebook_id, source_id, operation_id, deadline, auth, ...). The jobs keep
+        their IDs and event history, so clients polling /jobs/{id} carry on.
+        """
+        if self.store is None:
+            return []
+        self.store.prune(self.retention)
+
+        resumed = []
+        for record in self.store.claim(os.getpid()):
+            job = Job.from_record(record)
+            key = job.key
+            job.listener = self._persist
+            with self._lock:
+                if key in self._active or key in self._reserved:
+                    job.fail("Superseded by another job for the same video")
+                    continue
+                self._jobs[job.id] = job
+                self._active[key] = job
+            self._executor.submit(self._run, job, lambda job, record=record: fn(job, record), True)
+            resumed.append(job)
+        return resumed
+
+    def run_task(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Runs fn(*args) on the job pool without creating a job (e.g. one video of a bulk request)."""
+        return self._executor.submit(fn, *args)
+
+    def add_finished(self, key: Hashable, video_id: str, tool_type: str, result: Any) -> Job:
+        """Registers an already-completed job, e.g. for a result cache hit."""
+        job = Job(key, video_id, tool_type)
+        job.succeed(result)
+        if self.store is not None:
+            # Stored so other processes can answer /jobs/{id} for it
+            self.store.insert(job.id, video_id, tool_type, job.stage, job.created_at, events=job.events, result=result)
+        with self._lock:
+            self._prune_locked()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.get(job_id)
+            if record is not None:
+                job = Job.from_record(record)
+        return job
+
+    def wait_for_events(self, job: Job, after_seq: int, timeout: float) -> List[Dict]:
+        """Job.wait_for_events, also for jobs run by another process (followed through the store)."""
+        with self._lock:
+            local = self._jobs.get(job.id) is job
+        if local or self.store is None:
+            return job.wait_for_events(after_seq, timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            record = self.store.get(job.id)
+            events = (record.get("events") or [])[after_seq + 1:] if record else []
+            if events or record is None or time.monotonic() >= deadline:
+                return events
+            time.sleep(STORE_POLL_INTERVAL)
+
+    def _persist(self, job: Job, stage: str, info: Dict):
+        record = job.to_dict()
+        fields: Dict[str, Any] = {"stage": stage, "events": record["events"], "trace": record["trace"]}
+        for name in ("notebook_id", "source_id", "deadline", "result", "error"):
+            if name in info:
+                fields[name] = info[name]
+        operation_ids = info.get("operation_ids")
+        if operation_ids and len(operation_ids) == 1:
+            [fields["operation_id"]] = operation_ids
+        self.store.update(job.id, **fields)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any], resumed: bool = False):
+        try:
+            if not resumed:
+                job.report(STAGE_STARTED)
+            # Spans recorded by fn (stages, RPCs, polls) go to the job's trace
+            with activate(job.trace):
+                result = fn(job)
+            job.succeed(result)
+        except Exception as e:
+            logger.warning("Job %s failed: %s", job.id, e)
+            job.fail(str(e))
+        finally:
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def _prune_locked(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from client_pool import ClientPool
+
+logger = logging.getLogger(__name__)
+
+NOTEBOOK_TITLE = "Infographic Gen"
+
+
+class _WarmAccount:
+    def __init__(self, headers: Dict, at_token: Optional[str]):
+        self.headers = headers
+        self.at_token = at_token
+        self.ready: Deque[Tuple[str, float]] = deque()
+        self.refill_queued = False
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class NotebookPool:
+    """
+    Keeps up to `target_size` pre-created empty notebooks per account so a generation
+    can start at add_source instead of waiting on create_notebook.
+
+    Accounts are registered on their first take(); a background thread then creates
+    notebooks until the account is back at target. Notebooks older than `max_age`
+    are not handed out. Repeated refill failures (e.g. expired credentials) back off
+    and eventually drop the account.
+    """
+
+    def __init__(self, client_pool: ClientPool, target_size: int = 1, max_accounts: int = 16,
+                 max_age: float = 6 * 3600, max_failures: int = 3):
+        self.client_pool = client_pool
+        self.target_size = target_size
+        self.max_accounts = max_accounts
+        self.max_age = max_age
+        self.max_failures = max_failures
+        self._accounts: "OrderedDict[str, _WarmAccount]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refills: "queue.Queue[str]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.target_size > 0
+
+    def take(self, headers: Dict, at_token: Optional[str]) -> Optional[str]:
+        """Returns a ready notebook ID for this account, or None if none is available yet."""
+        if not self.enabled:
+            return None
+        key = ClientPool.account_key(headers, at_token)
+        notebook_id = None
+        now = time.time()
+
+        with self._lock:
+            account = self._accounts.get(key)
+            if account is None:
+                account = _WarmAccount(headers, at_token)
+                self._accounts[key] = account
+                while len(self._accounts) > self.max_accounts:
+                    self._accounts.popitem(last=False)
+            else:
+                # Keep the freshest credentials for background refills
+                account.headers, account.at_token = headers, at_token
+            self._accounts.move_to_end(key)
+
+            while account.ready:
+                candidate, created_at = account.ready.popleft()
+                if now - created_at < self.max_age:
+                    notebook_id = candidate
+                    break
+
+            self._schedule_locked(key, account)
+
+        if notebook_id:
+            logger.debug("Using warm notebook %s", notebook_id)
+        return notebook_id
+
+    def _schedule_locked(self, key: str, account: _WarmAccount):
+        if account.refill_queued or len(account.ready) >= self.target_size:
+            return
+        account.refill_queued = True
+        self._refills.put(key)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._refill_loop, name="notebook-pool", daemon=True)
+            self._worker.start()
+
+    def _refill_loop(self):
+        while True:
+            key = self._refills.get()
+            with self._lock:
+                account = self._accounts.get(key)
+            if account is None:
+                continue
+
+            delay = account.retry_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self._refill(account)
+                account.failures = 0
+            except Exception as e:
+                account.failures += 1
+                account.retry_at = time.time() + min(300, 10 * 2 ** account.failures)
+                logger.warning("Warm notebook refill failed (%s/%s): %s", account.failures, self.max_failures, e)
+            finally:
+                with self._lock:
+                    account.refill_queued = False
+                    if account.failures >= self.max_failures:
+                        if self._accounts.get(key) is account:
+                            del self._accounts[key]
+                    elif account.failures:
+                        self._schedule_locked(key, account)
+
+    def _refill(self, account: _WarmAccount):
+        with self.client_pool.client(account.headers, account.at_token) as client:
+            while True:
+                with self._lock:
+                    if len(account.ready) >= self.target_size:
+                        return
+                nb = client.create_notebook(NOTEBOOK_TITLE)
+                with self._lock:
+                    account.ready.append((nb['notebook_id'], time.time()))
+                logger.debug("Warm notebook ready: %s", nb['notebook_id'])
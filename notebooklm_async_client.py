@@ -0,0 +1,233 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for the async client
+    aiohttp = None
+
+from artifacts import ALL_ARTIFACTS, GENERATED_ARTIFACTS, ArtifactQuery
+from batchexecute import read_rpc_results
+from notebooklm_client import BaseNotebookLMClient, DEFAULT_BL, DEFAULT_HEADERS
+from polling import PollPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncNotebookLMClient(BaseNotebookLMClient):
+    """
+    asyncio counterpart of NotebookLMClient with the same pipeline methods as
+    coroutines, built on aiohttp and asyncio.sleep, so one event loop can drive many
+    concurrent generations. Payloads and response handling are shared with the sync
+    client through BaseNotebookLMClient.
+
+        async with AsyncNotebookLMClient(headers=headers, at_token=token) as client:
+            nb = await client.create_notebook("Infographic Gen")
+            src = await client.add_source(nb["notebook_id"], "URL", json.dumps({"url": url}))
+            op = await client.run_stdio_tool(None, "infographic", "", source_ids=[src["source_id"]])
+            result = await client.wait_for_tool_execution(op["operation_id"], "infographic")
+
+    Requires aiohttp (`pip install aiohttp`).
+    """
+
+    def __init__(self, base_url: str = "https://notebooklm.google.com", headers: Optional[Dict] = None, cookies: Optional[Dict] = None, at_token: Optional[str] = None, f_sid: Optional[str] = None, bl: Optional[str] = None, snapshot_ttl: float = 1.0, session: Optional["aiohttp.ClientSession"] = None):
+        if aiohttp is None:
+            raise ImportError("AsyncNotebookLMClient requires aiohttp: pip install aiohttp")
+        super().__init__(base_url=base_url, at_token=at_token, snapshot_ttl=snapshot_ttl)
+        self._headers = {**(headers or {}), **DEFAULT_HEADERS}
+        self._cookies = cookies
+        # Created lazily so the client can be constructed outside a running loop
+        self._session = session
+        self._owns_session = session is None
+        self.f_sid, self.bl = f_sid, bl
+
+    async def __aenter__(self) -> "AsyncNotebookLMClient":
+        await self._ensure_ready()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def _ensure_ready(self) -> "aiohttp.ClientSession":
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers=self._headers, cookies=self._cookies)
+        if not (self.f_sid and self.bl):
+            self.f_sid, self.bl = await self._fetch_params()
+            logger.debug("Initialized with f.sid: %s and bl: %s", self.f_sid, self.bl)
+        return self._session
+
+    async def _fetch_params(self) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            logger.debug("Fetching params from homepage...")
+            async with self._session.get(self.base_url + "/") as resp:
+                return self._parse_params(await resp.text())
+        except Exception as e:
+            logger.warning("Failed to fetch params: %s", e)
+            return None, DEFAULT_BL
+
+    async def _post_batchexecute(self, calls: List[Tuple[str, Any]]) -> List[Tuple[bool, list]]:
+        session = await self._ensure_ready()
+        rpc_ids = [rpc_id for rpc_id, _ in calls]
+        url, params, data = self._batchexecute_request(rpc_ids, self._encode_f_req(calls))
+
+        started = time.monotonic()
+        try:
+            async with session.post(url, params=params, data=data) as response:
+                body = await response.read()
+                if response.status != 200:
+                    raise Exception(f"HTTP Error {response.status}: {body.decode('utf-8', errors='ignore')}")
+            results = read_rpc_results([body], self._batch_calls(rpc_ids))
+        except Exception:
+            self._record_rpc(rpc_ids, started, "error")
+            raise
+        self._record_rpc(rpc_ids, started, "ok" if all(found for found, _ in results) else "empty")
+        return results
+
+    async def _execute_rpc(self, rpc_id: str, payload: Any) -> Any:
+        [(found_any, combined_results)] = await self._post_batchexecute([(rpc_id, payload)])
+        return combined_results if found_any else []
+
+    async def _execute_batch(self, calls: List[Tuple[str, Any]]) -> List[Any]:
+        if not calls:
+            return []
+        results = await self._post_batchexecute(calls)
+        return [combined_results for _, combined_results in results]
+
+    async def create_notebook(self, title: str, description: Optional[str] = None) -> Dict:
+        # RPC: CCqFvf
+        payload = [title, None, None, [2], [1, None, None, None, None, None, None, None, None, None, [1]]]
+
+        resp = await self._execute_rpc("CCqFvf", payload)
+        self.invalidate_snapshot()
+
+        notebook_id = self._notebook_id_from_response(resp)
+        if not notebook_id:
+             raise Exception(f"Failed to create notebook. API Response: {resp}")
+
+        self.current_notebook_id = notebook_id
+        return {"notebook_id": notebook_id, "title": title}
+
+    async def add_source(self, notebook_id: Optional[str], source_type: str, content: str, known_sources: Optional[list] = None) -> Dict:
+        if notebook_id:
+            self.current_notebook_id = notebook_id
+
+        if not self.current_notebook_id:
+            raise ValueError("Notebook ID required")
+
+        # Get initial sources to track new additions (see NotebookLMClient.add_source)
+        if known_sources is not None:
+            initial_sources = set(known_sources)
+        else:
+            initial_sources = set(await self._get_sources(self.current_notebook_id))
+
+        payload, is_youtube = self._source_payload(source_type, content)
+        resp = await self._execute_rpc("izAoDd", payload)
+        self.invalidate_snapshot()
+
+        extracted_source_id = self._find_uuid(resp)
+        if extracted_source_id:
+             logger.debug("Found Source ID immediately: %s", extracted_source_id)
+             return {"source_id": extracted_source_id, "status": "pending_background" if is_youtube else "completed"}
+
+        # Baseline diffing when the response did not carry the ID
+        logger.debug("Polling for new source ID via baseline diffing...")
+        async for _ in PollPolicy(timeout=40, initial=1.0, max_interval=5.0).start():
+            self.invalidate_snapshot()
+            new_items = set(await self._get_sources(self.current_notebook_id)) - initial_sources
+            if new_items:
+                found_id = list(new_items)[0]
+                logger.debug("Found new source ID: %s", found_id)
+                return {"source_id": found_id, "status": "completed"}
+
+        logger.warning("Polling timed out. No new source ID found.")
+        raise Exception("Failed to resolve new source ID after polling (Timeout)")
+
+    async def get_sources(self, notebook_id: str) -> list:
+        return await self._get_sources(notebook_id)
+
+    async def _get_sources(self, notebook_id: str) -> list:
+        # Unfiltered, as in NotebookLMClient._get_sources
+        return self._source_ids(await self._get_all_artifacts(notebook_id, query=ALL_ARTIFACTS))
+
+    async def refresh_notebook(self, notebook_id: str) -> Dict:
+        self.current_notebook_id = notebook_id
+        await self._get_all_artifacts(notebook_id, max_age=0)
+        return {"notebook_id": notebook_id, "status": "refreshed"}
+
+    async def run_stdio_tool(self, notebook_id: Optional[str], tool_type: str, input_text: str, source_ids: Optional[list] = None, options: Optional[Dict] = None) -> Dict:
+        if notebook_id:
+            self.current_notebook_id = notebook_id
+
+        if not self.current_notebook_id:
+            raise ValueError("Notebook ID required")
+
+        self._tool_id(tool_type)
+
+        if not source_ids:
+             source_ids = await self._get_sources(self.current_notebook_id)
+
+        if not source_ids:
+            raise ValueError("No sources in notebook to run tool on")
+
+        resp = await self._execute_rpc("R7cb6c", self._tool_payload(tool_type, source_ids))
+        self.invalidate_snapshot()
+
+        return {"operation_id": self._operation_id_from_response(resp), "status": "PENDING"}
+
+    async def _get_all_artifacts(self, notebook_id: str, max_age: Optional[float] = None,
+                                 query: ArtifactQuery = ALL_ARTIFACTS, expect: Optional[str] = None) -> list:
+        """See NotebookLMClient._get_all_artifacts."""
+        query = self._effective_query(query)
+        cached = self._cached_artifacts(notebook_id, max_age, query)
+        if cached is not None:
+            return cached
+
+        listings = self._artifact_listings(query, expect)
+        fetch = next(listings)
+        while True:
+            try:
+                fetch = listings.send(await self._fetch_artifacts(notebook_id, fetch))
+            except StopIteration as done:
+                return done.value
+
+    async def _fetch_artifacts(self, notebook_id: str, query: ArtifactQuery) -> list:
+        fetched_at = time.monotonic()
+        resp = await self._execute_rpc("gArtLc", self._artifacts_payload(notebook_id, query))
+        return self._store_artifacts(notebook_id, fetched_at, resp, query)
+
+    async def get_operation_status(self, operation_id: str, query: ArtifactQuery = GENERATED_ARTIFACTS) -> Dict:
+        if not self.current_notebook_id:
+             raise ValueError("Notebook ID required to check operation status")
+
+        artifacts = await self._get_all_artifacts(self.current_notebook_id, query=query, expect=operation_id)
+        return self._operation_status(artifacts, operation_id)
+
+    async def wait_for_tool_execution(self, operation_id: str, tool_type: str, timeout: Optional[float] = None, policy: Optional[PollPolicy] = None) -> Dict:
+        """Async version of NotebookLMClient.wait_for_tool_execution; same return values."""
+        logger.debug("wait_for_tool_execution (%s) started for %s", tool_type, operation_id)
+        if not self.current_notebook_id:
+             raise ValueError("Notebook ID required to check operation status")
+        policy = policy or PollPolicy.for_job(tool_type, timeout=timeout)
+        # One type-filtered snapshot per tick answers both lookups
+        query = ArtifactQuery(types=[self._tool_id(tool_type)])
+
+        async for _ in policy.start():
+            self.invalidate_snapshot()
+            artifacts = await self._get_all_artifacts(self.current_notebook_id, query=query, expect=operation_id)
+            result = self._tool_result(artifacts, operation_id, tool_type)
+            if result:
+                return result
+
+        return self._tool_timeout(operation_id, tool_type, policy)
+
+    async def get_generated_artifact(self, notebook_id: str, tool_type: str, query: Optional[ArtifactQuery] = None,
+                                     done_only: bool = False) -> Any:
+        self.current_notebook_id = notebook_id
+        artifacts = await self._get_all_artifacts(notebook_id, query=query or ArtifactQuery(types=[self._tool_id(tool_type)]))
+        return self._artifact_data(artifacts, tool_type, done_only=done_only)
@@ -1,63 +1,93 @@
 import json
+import logging
+import re
 import time
 import random
 import string
 import requests
 import urllib.parse
-from typing import Dict, Any, Optional, Tuple
-
-class NotebookLMClient:
-    def __init__(self, base_url: str = "https://notebooklm.google.com", headers: Optional[Dict] = None, cookies: Optional[Dict] = None, at_token: Optional[str] = None):
+from polling import PollPolicy, EXPECTED_DURATIONS
+from artifacts import (ALL_ARTIFACTS, ARTIFACT_CONTENT, GENERATED_ARTIFACTS, ArtifactIndex, ArtifactQuery,
+                       STATUS_DONE, STATUS_RUNNING, find_uuid)
+from batchexecute import iter_entries, read_rpc_results
+from metrics import RPC_LATENCY, RPC_QUEUE_DELAY, RPC_RATE_LIMITED, RPC_REQUESTS
+from rate_limiter import RateLimiter, rpc_priority
+import tracing
+from typing import Dict, Any, Generator, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the response stream at a time while parsing batchexecute envelopes
+RESPONSE_CHUNK_SIZE = 16 * 1024
+
+DEFAULT_BL = "boq_labs-tailwind-frontend_20260101.17_p0"
+
+DEFAULT_HEADERS = {
+    # Ensure Content-Type is set for batchexecute
+    "Content-Type": "application/x-www-form-urlencoded;charset=UTF-8",
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+}
+
+# Pause applied to an account's rate limiter on a 429 without a usable Retry-After
+RATE_LIMIT_PAUSE = 10.0
+
+# Map tools
+TOOL_IDS = {
+    "audio_overview": 1,
+    "summary": 3,
+    "study_guide": 4,
+    "mindmap": 5,
+    "infographic": 7,
+    "slide_deck": 8,
+    "timeline": 9,
+}
+
+class BaseNotebookLMClient:
+    """
+    Transport-independent half of the client: request encoding, envelope parsing,
+    payload construction and response interpretation. NotebookLMClient (requests)
+    and AsyncNotebookLMClient (aiohttp) add the I/O on top.
+    """
+
+    def __init__(self, base_url: str = "https://notebooklm.google.com", at_token: Optional[str] = None, snapshot_ttl: float = 1.0):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-        
-        if headers:
-            self.session.headers.update(headers)
-        
-        # Ensure Content-Type is set for batchexecute
-        self.session.headers.update({
-            "Content-Type": "application/x-www-form-urlencoded;charset=UTF-8",
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-        })
-
-        if cookies:
-            self.session.cookies.update(cookies)
-        
         self.at_token = at_token
         self.current_notebook_id: Optional[str] = None
         self._req_id_counter = random.randint(100000, 999999)
-        
-        # Dynamically fetch params to match current cookies/session
-        self.f_sid, self.bl = self._fetch_params()
-        print(f"DEBUG: Initialized with f.sid: {self.f_sid} and bl: {self.bl}")
+        self.f_sid: Optional[str] = None
+        self.bl: Optional[str] = None
+
+        # Short-lived gArtLc snapshot (notebook_id, fetched_at, artifacts, query) so the status,
+        # source and artifact lookups made in one poll tick share a single RPC
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[Tuple[str, float, list, ArtifactQuery]] = None
+        # Lookup index over the latest snapshot's artifacts
+        self._index: Optional[ArtifactIndex] = None
+        # Whether the server honours gArtLc filters: None until probed (filters are used meanwhile),
+        # True once a filtered listing held the artifact being probed for, False once a filter was
+        # seen dropping one, after which every listing is unfiltered
+        self.narrow_filters: Optional[bool] = None
+
+    @staticmethod
+    def _parse_params(html: str) -> Tuple[Optional[str], str]:
+        f_sid = None
+        matches = re.findall(r'"FdrFJe":"([-0-9]+)"', html)
+        if matches:
+            f_sid = matches[0]
+
+        bl = None
+        matches_bl = re.findall(r'"(boq_[^"]+)"', html)
+        if matches_bl:
+            labs = [m for m in matches_bl if "labs-tailwind" in m]
+            if labs:
+                bl = labs[0]
+            else:
+                bl = matches_bl[0]
 
-    def _fetch_params(self) -> Tuple[Optional[str], Optional[str]]:
-        try:
-            print("DEBUG: Fetching params from homepage...")
-            resp = self.session.get(self.base_url + "/")
-            import re
-            
-            f_sid = None
-            matches = re.findall(r'"FdrFJe":"([-0-9]+)"', resp.text)
-            if matches:
-                f_sid = matches[0]
-                
-            bl = None
-            matches_bl = re.findall(r'"(boq_[^"]+)"', resp.text)
-            if matches_bl:
-                labs = [m for m in matches_bl if "labs-tailwind" in m]
-                if labs:
-                    bl = labs[0]
-                else:
-                    bl = matches_bl[0]
-            
-            if not bl:
-                 bl = "boq_labs-tailwind-frontend_20260101.17_p0"
-                 
-            return f_sid, bl
-        except Exception as e:
-            print(f"Warning: Failed to fetch params: {e}")
-            return None, "boq_labs-tailwind-frontend_20260101.17_p0"
+        if not bl:
+             bl = DEFAULT_BL
+
+        return f_sid, bl
 
     def _get_req_id(self) -> str:
         self._req_id_counter += 1000
@@ -65,72 +95,40 @@ class NotebookLMClient:
 
     def _parse_envelope(self, content: bytes) -> Any:
         try:
-            # Robust Text-Based Parsing
-            # Ignore the byte-length prefixes and just look for valid JSON lines
-            text = content.decode('utf-8', errors='ignore')
-            
-            # Remove header prefix
-            if text.startswith(")]}'"):
-                text = text[4:]
-            
-            # The format is typically: length \n json \n length \n json
-            # We can try to parse everything that looks like a JSON array
-            lines = text.split('\n')
-            results = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line: continue
-                
-                # Heuristic: Valid batchexecute chunks are arrays starting with [[
-                if line.startswith('[['):
-                    try:
-                        obj = json.loads(line)
-                        results.append(obj)
-                    except:
-                        pass
-                elif line.startswith('[') and 'wrb.fr' in line:
-                     # Sometimes the structure is simpler
-                     try:
-                        obj = json.loads(line)
-                        results.append(obj)
-                     except:
-                        pass
-
-            # Flatten results
-            flattened = []
-            for res in results:
-                if isinstance(res, list):
-                    flattened.extend(res)
-            
+            # Decode the length-prefixed chunks and flatten their entries
+            flattened = list(iter_entries([content]))
+
             # Debug: Log if we found nothing
-            if not flattened and len(text) > 50:
-                 print(f"DEBUG: ParseEnvelope found no objects. Text sample: {text[:200]}")
-                 
+            if not flattened and len(content) > 50:
+                 logger.debug("ParseEnvelope found no objects. Text sample: %r", content[:200])
+
             return flattened
-            
+
         except Exception as e:
-            print(f"Error parsing envelope: {e}")
+            logger.error("Error parsing envelope: %s", e)
             return []
 
-    def _execute_rpc(self, rpc_id: str, payload: Any) -> Any:
-        if not self.at_token:
-            # Try to fetch or warn. For now, proceeding assumes token might be in cookies or not needed (unlikely)
-            pass
-
+    def _encode_f_req(self, calls: List[Tuple[str, Any]]) -> str:
+        # Each call: [rpc_id, payload_json, null, tag]. A lone call uses the "generic" tag;
+        # batched calls are tagged with their 1-based position so results can be matched back.
+        tagged = len(calls) > 1
+        return json.dumps([[
+            [rpc_id, json.dumps(payload), None, str(i + 1) if tagged else "generic"]
+            for i, (rpc_id, payload) in enumerate(calls)
+        ]])
+
+    def _batchexecute_request(self, rpc_ids: List[str], f_req: str) -> Tuple[str, Dict, Dict]:
+        """Returns (url, query params, form data) for a batchexecute POST."""
         url = f"{self.base_url}/_/LabsTailwindUi/data/batchexecute"
-        
+
         # Update Referer if inside a notebook
         # if self.current_notebook_id:
         #      self.session.headers.update({
         #          "Referer": f"{self.base_url}/notebook/{self.current_notebook_id}"
         #      })
-        
-        # Serialize payload: [payload_json, null, generic_id] wrapped in envelope
-        f_req = json.dumps([[[rpc_id, json.dumps(payload), null, "generic"] for null in [None]]])
-        
+
         params = {
-            "rpcids": rpc_id,
+            "rpcids": ",".join(dict.fromkeys(rpc_ids)),
             "source-path": f"/notebook/{self.current_notebook_id}" if self.current_notebook_id else "/",
             "f.sid": self.f_sid,
             "bl": self.bl,
@@ -138,65 +136,33 @@ class NotebookLMClient:
             "_reqid": self._get_req_id(),
             "rt": "c"
         }
-        
+
         data = {
             "f.req": f_req,
             "at": self.at_token or ""
         }
-        
+
         # DEBUG PAYLOAD
-        print(f"DEBUG REQ to {url} rpc={rpc_id} f.sid={params['f.sid']}")
+        logger.debug("REQ to %s rpc=%s f.sid=%s", url, params['rpcids'], params['f.sid'])
         # print(f"DEBUG REQ to {url} params={params} data={data}")
         # print(f"DEBUG REQ f.req={f_req}")
-        
-        response = self.session.post(url, params=params, data=data)
-        if response.status_code != 200:
-            raise Exception(f"HTTP Error {response.status_code}: {response.text}")
-            
-        parsed = self._parse_envelope(response.content)
-        
-        if not parsed or not isinstance(parsed, list):
-            # It's possible the response was empty or just status updates.
-            # Return raw parsed to be safe.
-            print(f"DEBUG: Empty/Invalid Parsed Response. Raw Body: {response.text[:200]}")
-            return parsed
-            
-        # print(f"DEBUG: Full Parsed Response: {json.dumps(parsed, indent=2)}") 
-        
-        combined_results = []
-        found_any = False
-        
-        for chunk in parsed:
-            if isinstance(chunk, list) and len(chunk) > 2 and chunk[1] == rpc_id:
-                inner_payload = chunk[2]
-                if inner_payload is not None:
-                    found_any = True
-                    try:
-                        data = json.loads(inner_payload)
-                        if isinstance(data, list):
-                            combined_results.extend(data)
-                        else:
-                            # If it's a dict or other, just append? RPCs usually return lists of items.
-                            # For safety, if it's not a list, maybe we shouldn't extend. 
-                            # But gArtLc returns [ [Item], [Item] ]
-                            combined_results.append(data)
-                    except:
-                        pass
-        
-        if found_any:
-            # print(f"DEBUG RPC '{rpc_id}' found {len(combined_results)} items.")
-            return combined_results
-            
-        # If no valid payload found, return empty list
-        # print(f"DEBUG RPC '{rpc_id}' returned EMPTY list. Raw parsed count: {len(parsed)}")
-        return []
-
-    def create_notebook(self, title: str, description: Optional[str] = None) -> Dict:
-        # RPC: CCqFvf
-        payload = [title, None, None, [2], [1, None, None, None, None, None, None, None, None, None, [1]]]
-        
-        resp = self._execute_rpc("CCqFvf", payload)
-        
+        return url, params, data
+
+    def _record_rpc(self, rpc_ids: List[str], started: float, outcome: str):
+        rpc_id = ",".join(dict.fromkeys(rpc_ids))
+        duration = time.monotonic() - started
+        RPC_LATENCY.observe(duration, rpc_id=rpc_id)
+        RPC_REQUESTS.inc(rpc_id=rpc_id, outcome=outcome)
+        tracing.record("rpc." + "+".join(dict.fromkeys(rpc_ids)), started, duration, outcome=outcome)
+
+    @staticmethod
+    def _batch_calls(rpc_ids: List[str]) -> List[Tuple[str, Optional[str]]]:
+        # Batched calls are matched back by rpc_id and their position tag
+        if len(rpc_ids) == 1:
+            return [(rpc_ids[0], None)]
+        return [(rpc_id, str(i + 1)) for i, rpc_id in enumerate(rpc_ids)]
+
+    def _notebook_id_from_response(self, resp: Any) -> Optional[str]:
         try:
            notebook_id = resp[2]
            if not notebook_id or not isinstance(notebook_id, str):
@@ -207,284 +173,71 @@ class NotebookLMClient:
                        break
         except:
              notebook_id = None
-
-        if not notebook_id:
-             raise Exception(f"Failed to create notebook. API Response: {resp}")
-
-        self.current_notebook_id = notebook_id
-        return {"notebook_id": notebook_id, "title": title}
+        return notebook_id
 
     def _find_uuid(self, obj: Any) -> Optional[str]:
-        # Recursive search for UUID string
-        if isinstance(obj, str):
-            if len(obj) == 36 and obj.count('-') == 4:
-                return obj
-            # Check for nested JSON string
-            if obj.strip().startswith('[') or obj.strip().startswith('{'):
-                try:
-                    nested = json.loads(obj)
-                    res = self._find_uuid(nested)
-                    if res: return res
-                except:
-                    pass
-                    
-        if isinstance(obj, list):
-            for item in obj:
-                res = self._find_uuid(item)
-                if res: return res
-                
-        if isinstance(obj, dict):
-            for val in obj.values():
-                res = self._find_uuid(val)
-                if res: return res
-                
-        return None
+        return find_uuid(obj)
 
-    def get_sources(self, notebook_id: str) -> list:
-        return self._get_sources(notebook_id)
-
-    def wait_for_ingestion_job(self, job_id: str) -> Dict:
-        print(f"DEBUG: Waiting for ingestion job {job_id}...")
-        print("Note: YouTube videos may take 1-2 minutes to process (transcription)...")
-        for i in range(60): # 5 minutes max
-            info = self.get_ingestion_status(job_id)
-            if info["status"] == "completed":
-                print("DEBUG: Ingestion job completed.")
-                return info
-            if i % 2 == 0:
-                 print("... still processing video ...")
-            time.sleep(5)
-        raise TimeoutError(f"Ingestion job {job_id} timed out")
-
-    def add_source(self, notebook_id: Optional[str], source_type: str, content: str) -> Dict:
-        if notebook_id:
-            self.current_notebook_id = notebook_id
-        
-        if not self.current_notebook_id:
-            raise ValueError("Notebook ID required")
-            
-        # Get initial sources to track new additions
-        initial_sources = set(self._get_sources(self.current_notebook_id))
-            
+    def _source_payload(self, source_type: str, content: str) -> Tuple[list, bool]:
+        """Builds the izAoDd payload for the current notebook. Returns (payload, is_youtube)."""
         source_type = source_type.upper()
-        
+
         # Check for YouTube URL
         is_youtube = False
         if "youtube.com" in content or "youtu.be" in content:
             is_youtube = True
-            print("DEBUG: YouTube URL detected. Handling as async media source.")
-            
+            logger.debug("YouTube URL detected. Handling as async media source.")
+
         # RPC: izAoDd
-        
+
         if source_type == "URL" or is_youtube:
             # Extract content as dictionary
             try:
                 url_val = json.loads(content).get("url")
             except:
-                url_val = content 
-                
+                url_val = content
+
             source_payload = [None] * 11
             source_payload[7] = [url_val]
             # HAR analysis shows 1 is used for YouTube as well
-            source_payload[10] = 1 
-            
+            source_payload[10] = 1
+
             payload = [
-                [source_payload], 
+                [source_payload],
                 self.current_notebook_id,
                 [2],
                 [1, None, None, None, None, None, None, None, None, None, [1]]
             ]
         else:
             raise NotImplementedError(f"Source type {source_type} not supported in this version")
-            
-        resp = self._execute_rpc("izAoDd", payload)
-        print(f"DEBUG: Add Source Response: {json.dumps(resp, indent=2)}")
-        
-        # Try to extract ID from response first
-        extracted_source_id = self._find_uuid(resp)
-        
-        if extracted_source_id:
-             print(f"DEBUG: Found Source ID immediately: {extracted_source_id}")
-             return {"source_id": extracted_source_id, "status": "pending_background" if is_youtube else "completed"}
-        
-        # Baseline Diffing Logic for Async Sources (YouTube) ONLY if ID not found
-        if is_youtube: 
-            print("DEBUG: Polling for new source ID via baseline diffing...")
-            for attempt in range(20): # 40 seconds max
-                # Refresh notebook state to trigger updates
-                self.refresh_notebook(self.current_notebook_id)
-                
-                # Fetch current sources
-                current_sources = set(self._get_sources(self.current_notebook_id))
-                
-                # Check for new items
-                new_items = current_sources - initial_sources
-                if new_items:
-                    found_id = list(new_items)[0]
-                    print(f"DEBUG: Found new source ID: {found_id}")
-                    return {"source_id": found_id, "status": "completed"}
-                
-                print(f"DEBUG: Attempt {attempt+1}/20: No new source yet. Sleeping...")
-                time.sleep(2)
-                
-            print("Warning: Polling timed out. No new source ID found.")
-            raise Exception("Failed to resolve new source ID after polling (Timeout)")
-        
-        print(f"DEBUG: Add Source Response: {json.dumps(resp, indent=2)}")
-
-        # Try to extract ID from response first
-        extracted_source_id = self._find_uuid(resp)
-        
-        # If standard find failed, parse nested JSON from izAoDd structure
-        if not extracted_source_id and isinstance(resp, list) and len(resp) > 2:
-             try:
-                 inner_json = resp[2]
-                 if isinstance(inner_json, str):
-                     parsed_inner = json.loads(inner_json)
-                     extracted_source_id = self._find_uuid(parsed_inner)
-             except:
-                 pass
+        return payload, is_youtube
 
-        final_source_id = extracted_source_id
-        
-        if is_youtube:
-            # Async ingestion handling
-            print("DEBUG: Async media source. Skipping blocking wait for user convenience.")
-            
-            # If we got an ID, verify it exists or just return it
-            if final_source_id:
-                 # Check 'wait_for_ingestion_job' ONLY if we want to block.
-                 # User requested "terminal ease", so we assume server will handle it.
-                 # Just return success.
-                 return {"source_id": final_source_id, "status": "pending_background"}
-            else:
-                 # If we didn't get an ID immediately, it likely failed or is being weird.
-                 # But we should try polling anyway because sometimes the backend is silent but effective.
-                 print("Warning: No Source ID returned from API. Will attempt to poll for new source...")
-                 # Do not return early. Fall through to polling logic.
-            
-            # Refresh notebook state
-            self.refresh_notebook(self.current_notebook_id)
-            
-            # Verify final ID exists
-            current_sources = self._get_sources(self.current_notebook_id)
-            if final_source_id and final_source_id in current_sources:
-                 return {"source_id": final_source_id, "status": "completed"}
-            elif not final_source_id:
-                 # Check if any new source appeared
-                 new_items = set(current_sources) - initial_sources
-                 if new_items:
-                     return {"source_id": list(new_items)[0], "status": "completed"}
-
-        if not final_source_id:
-             print("DEBUG: Source ID extraction failed. Attempting to poll for new source...")
-             try:
-                 new_source_id = self._poll_for_new_source(initial_sources)
-                 final_source_id = new_source_id
-             except TimeoutError:
-                 print("Warning: Ingestion polling timed out or source not found in list.")
-                 return {"source_id": None, "status": "unknown"}
-
-        return {"source_id": final_source_id, "status": "pending"}
-
-    def _poll_for_new_source(self, initial_sources: set) -> Optional[str]:
-        # Poll up to ~8 minutes (100 * 5s)
-        for i in range(100):
-            current_sources = self._get_sources(self.current_notebook_id)
-            # Use logic to find diff
-            curr_set = set(current_sources)
-            new_items = curr_set - initial_sources
-            if new_items:
-                return list(new_items)[0]
-            time.sleep(5)
-        raise TimeoutError("Ingestion timed out")
-
-    def _get_sources(self, notebook_id: str) -> list:
-        # Use _get_all_artifacts which uses correct HAR payload
-        resp = self._get_all_artifacts(notebook_id)
-        
-        if not resp:
+    def _source_ids(self, artifacts: list) -> list:
+        if not artifacts:
             return []
+        # Collected while indexing the snapshot, from each artifact's sources field
+        return list(self._artifact_index(artifacts).source_ids)
 
-        # Flatten response to find source IDs
-        ids = []
-        def collect_uuids(obj):
-            if isinstance(obj, str) and len(obj) == 36 and obj.count('-') == 4:
-                ids.append(obj)
-            if isinstance(obj, list):
-                for item in obj:
-                    collect_uuids(item)
-                    
-        collect_uuids(resp)
-        return ids
-
-    def get_operation_status(self, operation_id: str) -> Dict:
-        if not self.current_notebook_id:
-             raise ValueError("Notebook ID required to check operation status")
-             
-        artifacts = self._get_all_artifacts(self.current_notebook_id)
-        
-        target = None
-        for art in artifacts:
-            if isinstance(art, list) and len(art) > 0 and art[0] == operation_id:
-                target = art
-                break
-                
-        if not target:
-            return {"operation_id": operation_id, "status": "UNKNOWN"}
-
-    def get_ingestion_status(self, job_id: str) -> Dict:
-        # Check if job_id (source_id) exists in notebook sources
-        sources = self._get_sources(self.current_notebook_id)
-        status = "completed" if job_id in sources else "processing"
-        return {"job_id": job_id, "status": status}
-
-    def refresh_notebook(self, notebook_id: str) -> Dict:
-        self.current_notebook_id = notebook_id
-        # Call gArtLc to get fresh state (sources etc)
-        self._get_sources(notebook_id)
-        return {"notebook_id": notebook_id, "status": "refreshed"}
-
-    def run_stdio_tool(self, notebook_id: Optional[str], tool_type: str, input_text: str, source_ids: Optional[list] = None, options: Optional[Dict] = None) -> Dict:
-        if notebook_id:
-            self.current_notebook_id = notebook_id
-        
-        if not self.current_notebook_id:
-            raise ValueError("Notebook ID required")
-
-        # Map tools
-        tools = {
-            "audio_overview": 1,
-            "summary": 3,
-            "study_guide": 4,
-            "mindmap": 5,
-            "infographic": 7,
-            "slide_deck": 8,
-            "timeline": 9,
-        }
-        
-        tool_id = tools.get(tool_type.lower())
+    def _tool_id(self, tool_type: str) -> int:
+        tool_id = TOOL_IDS.get(tool_type.lower())
         if not tool_id and "infographic" in tool_type.lower():
              tool_id = 7
-             
+
         if not tool_id:
              raise ValueError(f"Unknown tool: {tool_type}")
+        return tool_id
 
-        # Need Source IDs. 
-        if not source_ids:
-             source_ids = self._get_sources(self.current_notebook_id)
-             
-        if not source_ids:
-            raise ValueError("No sources in notebook to run tool on")
-            
+    def _tool_payload(self, tool_type: str, source_ids: list) -> list:
+        """Builds the R7cb6c payload running tool_type on source_ids in the current notebook."""
+        tool_id = self._tool_id(tool_type)
         source_param = [[[sid]] for sid in source_ids]
-        
+
         # Payload structures based on HAR analysis
-        
+
         if tool_id == 7: # Infographic
             # [None, None, 7, source, None * 10, [[None, None, None, 1, 2]]]
              tool_payload = [None, None, 7, source_param] + [None]*10 + [[[None, None, None, 1, 2]]]
-             
+
         elif tool_id == 8: # Slide Deck
             # [None, None, 8, source, None * 12, [[]]]
             # Count from HAR: 16 nulls/items before tail?
@@ -493,78 +246,138 @@ class NotebookLMClient:
             # PRETTY PAYLOAD shows: [N,N,8,Source, N x 12, [[]]]
             # Let's trust the pattern [N, N, ID, Source] + Padding + Tail
             tool_payload = [None, None, 8, source_param] + [None]*12 + [[[]]]
-            
+
         elif tool_id == 9: # Timeline
             # [N, N, 9, Source, N x 14, [None, []]]
             tool_payload = [None, None, 9, source_param] + [None]*14 + [[None, []]]
-            
+
         elif tool_id == 4: # Study Guide
             # [N, N, 4, Source, N x 5, [None, [1, None, None, None, None, None, [2,2]]]]
             tail = [None, [1, None, None, None, None, None, [2,2]]]
             tool_payload = [None, None, 4, source_param] + [None]*5 + [tail]
-            
+
         elif tool_id == 3: # Summary
              # Try simpler structure: [None, None, 3, source, None * 12, [[]]]
              # Matches Slide Deck / Generic
              # tool_payload = [None, None, 3, source_param] + [None]*10 + [[[None, None, None, 1, 2]]]
              # FAILED with empty result. Trying Slide Deck style
              tool_payload = [None, None, 3, source_param] + [None]*12 + [[[]]]
-             
+
         elif tool_id == 1: # Audio Overview
              # HAR Structure (approx):
              # [None, None, 1, source_param, None, None, [None, [None, None, None, source_simple, "en-GB", True]], ...]
              # source_simple seems to be [["UUID"]] instead of [[["UUID"]]]
              source_simple = source_param[0] if source_param else []
              conf_block = [None, [None, None, None, source_simple, "en-GB", True]]
-             
-             # The timestamps in HAR might be optional or generated? 
+
+             # The timestamps in HAR might be optional or generated?
              # Let's try matching the head and see if tail is defaulted.
              # [..., conf_block, None, None, None, [TS, TS], ...]
              # Using a shorter version first to see if server accepts it (often defaults work).
              # If not, we might need to copy the FULL struct.
              # For now, let's look at the fallback I used before:
              # [None, [1, None, None, "en-GB", None, None, [2,2], None, True]]
-             # That fallback was for "Audio" in some contexts? 
-             
+             # That fallback was for "Audio" in some contexts?
+
              # Let's use the structure derived from Step 360 HAR dump for ID 1:
              # [N, N, 1, Source, N, N, [N, [N,N,N, S_Simple, "en-GB", True]]]
              tool_payload = [None, None, 1, source_param, None, None, conf_block]
-             
+
         elif tool_id == 5: # Mind Map
              # No HAR data available. Assume similar to Summary/Infographic (ID 3/7)
              # as they are standard text-processing tools.
              tool_payload = [None, None, 5, source_param] + [None]*10 + [[[None, None, None, 1, 2]]]
-             
+
         else:
              # Fallback
              tool_payload = [
                 None, None, tool_id, source_param, 1, None, None, None, None,
-                [None, [1, None, None, "en-GB", None, None, [2,2], None, True]] 
+                [None, [1, None, None, "en-GB", None, None, [2,2], None, True]]
             ]
 
-        payload = [[2], self.current_notebook_id, tool_payload]
-        
-        resp = self._execute_rpc("R7cb6c", payload)
-        
+        return [[2], self.current_notebook_id, tool_payload]
+
+    def _operation_id_from_response(self, resp: Any) -> Optional[str]:
         op_id = None
         if isinstance(resp, list) and len(resp) > 0 and isinstance(resp[0], list):
              op_id = resp[0][0]
-             
+
         if not op_id:
-             print(f"Warning: Could not extract Operation ID from response: {resp}")
+             logger.warning("Could not extract Operation ID from response: %s", resp)
+        return op_id
+
+    def invalidate_snapshot(self):
+        self._snapshot = None
+
+    def _cached_artifacts(self, notebook_id: str, max_age: Optional[float] = None,
+                          query: ArtifactQuery = ALL_ARTIFACTS) -> Optional[list]:
+        # Reuse the snapshot if it is for this notebook, younger than max_age (default
+        # snapshot_ttl) and fetched with a query at least as wide as this one
+        max_age = self.snapshot_ttl if max_age is None else max_age
+        snapshot = self._snapshot
+        if snapshot and snapshot[0] == notebook_id and time.monotonic() - snapshot[1] < max_age \
+                and snapshot[3].covers(query):
+            return snapshot[2]
+        return None
 
-        return {"operation_id": op_id, "status": "PENDING"}
+    def _effective_query(self, query: ArtifactQuery) -> ArtifactQuery:
+        return ALL_ARTIFACTS if self.narrow_filters is False else query
+
+    def _artifacts_payload(self, notebook_id: str, query: ArtifactQuery = ALL_ARTIFACTS) -> list:
+        # RPC: gArtLc. The third field is the filter expression (None lists everything).
+        return [[2], notebook_id, query.filter]
 
-    def _get_all_artifacts(self, notebook_id: str) -> list:
-        # RPC: gArtLc
-        # Use filter from HAR
-        # payload = [[2], notebook_id, "NOT artifact.status = \"ARTIFACT_STATUS_SUGGESTED\""]
-        # Try no filter to ensure we get everything
-        payload = [[2], notebook_id, None]
-        resp = self._execute_rpc("gArtLc", payload)
+    def _probes_filter(self, query: ArtifactQuery, expect: Optional[str]) -> bool:
+        return expect is not None and self.narrow_filters is None and query.filter is not None
+
+    def _lists(self, artifacts: list, expect: str, query: ArtifactQuery) -> bool:
+        """True if `expect` is among the artifacts and is something `query` selects by type."""
+        target = self._artifact_index(artifacts).get(expect)
+        return target is not None and (not query.types or query.matches_type(target.raw))
+
+    def _filter_dropped(self, query: ArtifactQuery, expect: str):
+        logger.warning("gArtLc filter %r dropped artifact %s; listing unfiltered from now on", query.filter, expect)
+        self.narrow_filters = False
+
+    def _artifact_listings(self, query: ArtifactQuery, expect: Optional[str]) -> Generator[ArtifactQuery, list, list]:
+        """
+        The gArtLc listings behind one _get_all_artifacts lookup, without the I/O: yields
+        each query to fetch, is sent the stored listing, and returns the one to answer with.
+
+        An empty filtered listing is taken as is. Until this client knows whether the server
+        honours filters, a lookup that names an artifact known to exist (`expect`, e.g. a
+        started operation) doubles as a probe: if the filtered listing lacks it, an
+        unfiltered listing is fetched. An artifact found only there (and still missing from
+        a second filtered listing, in case it appeared in between) means the filter is not
+        understood, and this client stops filtering. Filters are trusted only once the
+        artifact shows up in a filtered listing; a probe that finds it nowhere (e.g. an
+        operation not listed yet) decides nothing, and the next lookup probes again.
+        """
+        artifacts = yield query
+        if not self._probes_filter(query, expect):
+            return artifacts
+        if self._lists(artifacts, expect, query):
+            self.narrow_filters = True
+            return artifacts
+
+        wide = yield ALL_ARTIFACTS
+        wide_snapshot = self._snapshot
+        if not self._lists(wide, expect, query):
+            return wide
+        confirmed = yield query
+        if self._lists(confirmed, expect, query):
+            self.narrow_filters = True
+            return confirmed
+        self._filter_dropped(query, expect)
+        self._snapshot = wide_snapshot
+        return wide
+
+    def _store_artifacts(self, notebook_id: str, fetched_at: float, resp: Any,
+                         query: ArtifactQuery = ALL_ARTIFACTS) -> list:
         if not resp:
+            self._snapshot = (notebook_id, fetched_at, [], query)
             return []
-        
+
         # Flatten if response is nested (common in gArtLc: [[Art1, Art2]])
         flat = []
         for item in resp:
@@ -572,148 +385,121 @@ class NotebookLMClient:
                  flat.extend(item)
              else:
                  flat.append(item)
+        self._snapshot = (notebook_id, fetched_at, flat, query)
         return flat
 
-    def get_operation_status(self, operation_id: str) -> Dict:
-        if not self.current_notebook_id:
-             raise ValueError("Notebook ID required to check operation status")
-             
-        artifacts = self._get_all_artifacts(self.current_notebook_id)
-        
-        target = None
-        for art in artifacts:
-            if isinstance(art, list) and len(art) > 0 and art[0] == operation_id:
-                target = art
-                break
-                
+    def _artifact_index(self, artifacts: list) -> ArtifactIndex:
+        # One index per snapshot: rebuilt only when a new artifacts list has been fetched
+        index = self._index
+        if index is None or index.source is not artifacts:
+            index = self._index = ArtifactIndex(artifacts)
+        return index
+
+    def _operation_status(self, artifacts: list, operation_id: str) -> Dict:
+        target = self._artifact_index(artifacts).get(operation_id)
+
         if not target:
             return {"operation_id": operation_id, "status": "UNKNOWN"}
-            
-        status_code = target[4] if len(target) > 4 else None
-        
-        if status_code == 3:
+
+        status_code = target.status
+
+        if status_code == STATUS_DONE:
             state = "COMPLETED" # Mapped to DONE in wait wrapper
-        elif status_code == 1:
+        elif status_code == STATUS_RUNNING:
             state = "RUNNING"
         elif status_code is None:
              state = "PENDING"
         else:
             state = "FAILED"
-            
+
         return {"operation_id": operation_id, "status": state}
 
-    def wait_for_tool_execution(self, operation_id: str, tool_type: str, poll_interval: int = 3) -> Dict:
+    def _tool_result(self, artifacts: list, operation_id: str, tool_type: str) -> Optional[Dict]:
         """
-        Polls for the completion of a tool execution.
-        tool_type: "infographic", "summary", "audio_overview", "study_guide", etc.
-        Returns: { "status": "DONE", "operationId": ..., "data": ... }
+        One poll of an operation against a listing that covers tool_type: its DONE or
+        FAILED result, or None while it is unfinished or its content is not listed yet.
         """
-        print(f"DEBUG: wait_for_tool_execution ({tool_type}) started for {operation_id}")
-        last_print = 0
-        
-        while True:
-            status_info = self.get_operation_status(operation_id)
-            state = status_info.get("status")
-            
-            # Map COMPLETED to DONE
-            if state == "COMPLETED":
-                state = "DONE"
-            
-            if time.time() - last_print > 5:
-                print(f"DEBUG: Operation {operation_id} status: {state}")
-                last_print = time.time()
-            
-            if state == "DONE":
-                try:
-                    data = self.get_generated_artifact(self.current_notebook_id, tool_type)
-                    return {
-                        "status": "DONE",
-                        "operationId": operation_id,
-                        "data": data
-                    }
-                except Exception as e:
-                    print(f"Operation DONE but extraction failed: {e}. Retrying extraction...")
-                    time.sleep(2)
-                    data = self.get_generated_artifact(self.current_notebook_id, tool_type)
-                    return {
-                        "status": "DONE",
-                        "operationId": operation_id,
-                        "data": data
-                    }
-
-            # Fallback: If UNKNOWN (lost op) or RUNNING, check if artifact exists anyway
-            if state in ["UNKNOWN", "RUNNING"]:
-                 try:
-                     # Check if we can find a *recent* artifact of this type
-                     # AND verify we can extract data from it (proving it's done)
-                     temp_data = self.get_generated_artifact(self.current_notebook_id, tool_type)
-                     if temp_data:
-                         print(f"DEBUG: Operation {state} but Artifact content found. Returning DONE.")
-                         return {
-                            "status": "DONE", 
-                            "operationId": operation_id,
-                            "data": temp_data
-                         }
-                 except:
-                     pass # Not ready
-
-            if state == "FAILED":
-                return {
-                    "status": "FAILED",
-                    "operationId": operation_id,
-                    "error": "Operation reported failure"
-                }
-
-            time.sleep(poll_interval)
-
-    def get_generated_artifact(self, notebook_id: str, tool_type: str) -> Any:
-        self.current_notebook_id = notebook_id
-        artifacts = self._get_all_artifacts(notebook_id)
-        
-        tools_map = {
-            "audio_overview": 1,
-            "summary": 3,
-            "study_guide": 4,
-            "mindmap": 5,
-            "infographic": 7,
-            "slide_deck": 8,
-            "timeline": 9,
+        state = self._operation_status(artifacts, operation_id)["status"]
+        if state == "FAILED":
+            return {
+                "status": "FAILED",
+                "operationId": operation_id,
+                "toolType": tool_type,
+                "error": "Operation reported failure"
+            }
+        if state not in ("COMPLETED", "UNKNOWN", "RUNNING"):
+            return None
+
+        # A lost (UNKNOWN) or still RUNNING operation also counts as done once the newest
+        # artifact of its type is itself DONE and has content
+        try:
+            data = self._artifact_data(artifacts, tool_type, done_only=state != "COMPLETED")
+        except Exception as e:
+            # The next tick retries against a fresh snapshot
+            logger.warning("Operation %s but extraction failed: %s. Retrying extraction...", state, e)
+            return None
+        if data is None:
+            # Content not listed yet; the next tick looks again
+            return None
+        if state != "COMPLETED":
+            logger.debug("Operation %s but Artifact content found. Returning DONE.", state)
+        return {
+            "status": "DONE",
+            "operationId": operation_id,
+            "toolType": tool_type,
+            "data": data
+        }
+
+    @staticmethod
+    def _tool_timeout(operation_id: str, tool_type: str, policy: PollPolicy) -> Dict:
+        return {
+            "status": "TIMEOUT",
+            "operationId": operation_id,
+            "toolType": tool_type,
+            "error": f"Operation did not finish within {policy.timeout:.0f}s"
         }
-        
-        target_type_id = tools_map.get(tool_type.lower())
+
+    def _artifact_data(self, artifacts: list, tool_type: str, done_only: bool = False) -> Any:
+        """
+        Content of the newest artifact of tool_type, or None while there is none or its
+        content slot is still empty. With done_only, also None unless that artifact is STATUS_DONE.
+        """
+        target_type_id = TOOL_IDS.get(tool_type.lower())
         if not target_type_id:
              raise ValueError(f"Unknown tool type: {tool_type}")
-             
-        candidates = []
-        for art in artifacts:
-            if isinstance(art, list) and len(art) > 2 and art[2] == target_type_id:
-                candidates.append(art)
-                
-        if not candidates:
+
+        # Newest artifact of the type (by timestamp at index 10)
+        latest = self._artifact_index(artifacts).latest(target_type_id)
+
+        if not latest:
             # raise Exception(f"No assets of type {tool_type} found in notebook")
             return None # Allow None so polling loop can continue
-            
-        def get_ts(item):
-            # timestamp usually at index 10: [sec, nanos]
-            if len(item) > 10 and isinstance(item[10], list) and len(item[10]) > 0:
-                 return item[10][0]
-            return 0
-            
-        candidates.sort(key=get_ts, reverse=True)
-        latest = candidates[0]
-        
+        if done_only and latest.status != STATUS_DONE:
+            return None
+
         # Extraction logic per type
         if target_type_id == 7: # Infographic
-             return self._extract_infographic(latest)
+             return self._extract_infographic(latest.raw)
         elif target_type_id == 3: # Summary
-             return self._extract_summary(latest)
+             return self._extract_summary(latest.raw)
         elif target_type_id == 1: # Audio
-             return self._extract_audio(latest)
-        
+             return self._extract_audio(latest.raw)
+
         # Default return raw artifact for unmapped types
-        return latest
+        return self._extract_raw(latest.raw)
+
+    @staticmethod
+    def _content(artifact: list) -> Any:
+        # The content slot, or None while the artifact has no content yet
+        content = artifact[ARTIFACT_CONTENT] if len(artifact) > ARTIFACT_CONTENT else None
+        return content or None
 
-    def _extract_infographic(self, artifact: list) -> str:
+    def _extract_raw(self, artifact: list) -> Optional[list]:
+        return artifact if self._content(artifact) is not None else None
+
+    def _extract_infographic(self, artifact: list) -> Optional[str]:
+        if self._content(artifact) is None:
+            return None
         try:
             content_block = artifact[14]
             items = content_block[2]
@@ -722,7 +508,9 @@ class NotebookLMClient:
         except:
              raise Exception("Failed to extract Infographic URL")
 
-    def _extract_summary(self, artifact: list) -> str:
+    def _extract_summary(self, artifact: list) -> Optional[str]:
+        if self._content(artifact) is None:
+            return None
         try:
              # Summary text is usually in index 14 -> 2 -> 0 -> 0 (text)
              # Structure inspection needed. Assuming generic text block.
@@ -739,18 +527,486 @@ class NotebookLMClient:
     def _extract_audio(self, artifact: list) -> Optional[str]:
          try:
              # content_block is at index 14. If it's None, no audio yet.
-             if len(artifact) <= 14 or artifact[14] is None:
+             if self._content(artifact) is None:
                  return None
-                 
+
              content_block = artifact[14]
-             # For Audio, we expect a URL or specific structure. 
-             return str(content_block) 
+             # For Audio, we expect a URL or specific structure.
+             return str(content_block)
          except:
              return None
 
+
+class NotebookLMClient(BaseNotebookLMClient):
+    def __init__(self, base_url: str = "https://notebooklm.google.com", headers: Optional[Dict] = None, cookies: Optional[Dict] = None, at_token: Optional[str] = None, f_sid: Optional[str] = None, bl: Optional[str] = None, snapshot_ttl: float = 1.0, rate_limiter: Optional[RateLimiter] = None):
+        super().__init__(base_url=base_url, at_token=at_token, snapshot_ttl=snapshot_ttl)
+        self.session = requests.Session()
+        # Shared by all clients of an account (see client_pool.py); None sends RPCs unthrottled
+        self.rate_limiter = rate_limiter
+
+        if headers:
+            self.session.headers.update(headers)
+
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        if cookies:
+            self.session.cookies.update(cookies)
+
+        # Dynamically fetch params to match current cookies/session,
+        # unless the caller already has them cached (see client_pool.py)
+        if f_sid and bl:
+            self.f_sid, self.bl = f_sid, bl
+        else:
+            self.f_sid, self.bl = self._fetch_params()
+        logger.debug("Initialized with f.sid: %s and bl: %s", self.f_sid, self.bl)
+
+    def _fetch_params(self) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            logger.debug("Fetching params from homepage...")
+            with tracing.span("fetch_params"):
+                resp = self.session.get(self.base_url + "/")
+            return self._parse_params(resp.text)
+        except Exception as e:
+            logger.warning("Failed to fetch params: %s", e)
+            return None, DEFAULT_BL
+
+    def _post_batchexecute(self, rpc_ids: List[str], f_req: str, stream: bool = False) -> requests.Response:
+        url, params, data = self._batchexecute_request(rpc_ids, f_req)
+
+        response = self.session.post(url, params=params, data=data, stream=stream)
+        if response.status_code == 429:
+            RPC_RATE_LIMITED.inc()
+            if self.rate_limiter is not None:
+                pause = self._retry_after(response)
+                logger.warning("Rate limited by batchexecute, pausing RPCs for %.0fs", pause)
+                self.rate_limiter.pause(pause)
+        if response.status_code != 200:
+            raise Exception(f"HTTP Error {response.status_code}: {response.text}")
+        return response
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        try:
+            return max(1.0, float(response.headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            return RATE_LIMIT_PAUSE
+
+    def _throttle(self, rpc_ids: List[str]):
+        """Waits for the account's rate limiter, job-starting RPCs ahead of polls."""
+        if self.rate_limiter is None:
+            return
+        started = time.monotonic()
+        waited = self.rate_limiter.acquire(rpc_priority(rpc_ids))
+        if waited:
+            tracing.record("rate_limit", started, waited)
+        RPC_QUEUE_DELAY.observe(waited, rpc_id=",".join(dict.fromkeys(rpc_ids)))
+        if waited >= 1:
+            logger.debug("%s waited %.1fs for the rate limiter", ",".join(rpc_ids), waited)
+
+    def _read_results(self, response: requests.Response, calls: List[Tuple[str, Optional[str]]]) -> List[Tuple[bool, list]]:
+        # Parse the envelope as it streams in, decoding only the payloads we asked for
+        try:
+            return read_rpc_results(response.iter_content(chunk_size=RESPONSE_CHUNK_SIZE), calls)
+        finally:
+            response.close()
+
+    def _execute_rpc(self, rpc_id: str, payload: Any) -> Any:
+        if not self.at_token:
+            # Try to fetch or warn. For now, proceeding assumes token might be in cookies or not needed (unlikely)
+            pass
+
+        self._throttle([rpc_id])
+        started = time.monotonic()
+        try:
+            response = self._post_batchexecute([rpc_id], self._encode_f_req([(rpc_id, payload)]), stream=True)
+            [(found_any, combined_results)] = self._read_results(response, self._batch_calls([rpc_id]))
+        except Exception:
+            self._record_rpc([rpc_id], started, "error")
+            raise
+        self._record_rpc([rpc_id], started, "ok" if found_any else "empty")
+
+        if found_any:
+            # print(f"DEBUG RPC '{rpc_id}' found {len(combined_results)} items.")
+            return combined_results
+
+        # If no valid payload found, return empty list
+        # print(f"DEBUG RPC '{rpc_id}' returned EMPTY list.")
+        return []
+
+    def _execute_batch(self, calls: List[Tuple[str, Any]]) -> List[Any]:
+        """
+        Sends several (rpc_id, payload) calls in one batchexecute POST.
+        Returns one result per call, in call order, each shaped like _execute_rpc's return value.
+        """
+        if not calls:
+            return []
+        if len(calls) == 1:
+            return [self._execute_rpc(*calls[0])]
+
+        rpc_ids = [rpc_id for rpc_id, _ in calls]
+        self._throttle(rpc_ids)
+        started = time.monotonic()
+        try:
+            response = self._post_batchexecute(rpc_ids, self._encode_f_req(calls), stream=True)
+            results = self._read_results(response, self._batch_calls(rpc_ids))
+        except Exception:
+            self._record_rpc(rpc_ids, started, "error")
+            raise
+        self._record_rpc(rpc_ids, started, "ok" if all(found for found, _ in results) else "empty")
+        return [combined_results for _, combined_results in results]
+
+    def batch(self) -> "RpcBatch":
+        return RpcBatch(self)
+
+    def create_notebook(self, title: str, description: Optional[str] = None) -> Dict:
+        # RPC: CCqFvf
+        payload = [title, None, None, [2], [1, None, None, None, None, None, None, None, None, None, [1]]]
+
+        resp = self._execute_rpc("CCqFvf", payload)
+        self.invalidate_snapshot()
+
+        notebook_id = self._notebook_id_from_response(resp)
+
+        if not notebook_id:
+             raise Exception(f"Failed to create notebook. API Response: {resp}")
+
+        self.current_notebook_id = notebook_id
+        return {"notebook_id": notebook_id, "title": title}
+
+    def get_sources(self, notebook_id: str) -> list:
+        return self._get_sources(notebook_id)
+
+    def wait_for_ingestion_job(self, job_id: str, policy: Optional[PollPolicy] = None) -> Dict:
+        logger.debug("Waiting for ingestion job %s...", job_id)
+        logger.info("Note: YouTube videos may take 1-2 minutes to process (transcription)...")
+        policy = policy or PollPolicy.for_job("ingestion", timeout=300)
+        for i in policy.start():
+            self.invalidate_snapshot()
+            info = self.get_ingestion_status(job_id)
+            if info["status"] == "completed":
+                logger.debug("Ingestion job completed.")
+                return info
+            if i % 2 == 0:
+                 logger.debug("... still processing video ...")
+        raise TimeoutError(f"Ingestion job {job_id} timed out")
+
+    def add_source(self, notebook_id: Optional[str], source_type: str, content: str, known_sources: Optional[list] = None) -> Dict:
+        """
+        known_sources: source IDs already in the notebook, if the caller knows them
+        (e.g. [] for a freshly created notebook). They are the baseline for spotting
+        the new source when the response does not carry its ID, and passing them
+        saves the gArtLc call that would otherwise fetch that baseline up front.
+        """
+        if notebook_id:
+            self.current_notebook_id = notebook_id
+
+        if not self.current_notebook_id:
+            raise ValueError("Notebook ID required")
+
+        # Get initial sources to track new additions
+        if known_sources is not None:
+            initial_sources = set(known_sources)
+        else:
+            initial_sources = set(self._get_sources(self.current_notebook_id))
+
+        payload, is_youtube = self._source_payload(source_type, content)
+
+        resp = self._execute_rpc("izAoDd", payload)
+        self.invalidate_snapshot()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Add Source Response: %s", json.dumps(resp, indent=2))
+
+        # Try to extract ID from response first
+        extracted_source_id = self._find_uuid(resp)
+
+        if extracted_source_id:
+             logger.debug("Found Source ID immediately: %s", extracted_source_id)
+             return {"source_id": extracted_source_id, "status": "pending_background" if is_youtube else "completed"}
+
+        # Baseline Diffing Logic for Async Sources (YouTube) ONLY if ID not found
+        if is_youtube:
+            logger.debug("Polling for new source ID via baseline diffing...")
+            for attempt in PollPolicy(timeout=40, initial=1.0, max_interval=5.0).start():
+                # Refresh notebook state to trigger updates
+                self.refresh_notebook(self.current_notebook_id)
+
+                # Fetch current sources
+                current_sources = set(self._get_sources(self.current_notebook_id))
+
+                # Check for new items
+                new_items = current_sources - initial_sources
+                if new_items:
+                    found_id = list(new_items)[0]
+                    logger.debug("Found new source ID: %s", found_id)
+                    return {"source_id": found_id, "status": "completed"}
+
+                logger.debug("Attempt %s: No new source yet. Sleeping...", attempt+1)
+
+            logger.warning("Polling timed out. No new source ID found.")
+            raise Exception("Failed to resolve new source ID after polling (Timeout)")
+
+        # Try to extract ID from response first
+        extracted_source_id = self._find_uuid(resp)
+
+        # If standard find failed, parse nested JSON from izAoDd structure
+        if not extracted_source_id and isinstance(resp, list) and len(resp) > 2:
+             try:
+                 inner_json = resp[2]
+                 if isinstance(inner_json, str):
+                     parsed_inner = json.loads(inner_json)
+                     extracted_source_id = self._find_uuid(parsed_inner)
+             except:
+                 pass
+
+        final_source_id = extracted_source_id
+
+        if is_youtube:
+            # Async ingestion handling
+            logger.debug("Async media source. Skipping blocking wait for user convenience.")
+
+            # If we got an ID, verify it exists or just return it
+            if final_source_id:
+                 # Check 'wait_for_ingestion_job' ONLY if we want to block.
+                 # User requested "terminal ease", so we assume server will handle it.
+                 # Just return success.
+                 return {"source_id": final_source_id, "status": "pending_background"}
+            else:
+                 # If we didn't get an ID immediately, it likely failed or is being weird.
+                 # But we should try polling anyway because sometimes the backend is silent but effective.
+                 logger.warning("No Source ID returned from API. Will attempt to poll for new source...")
+                 # Do not return early. Fall through to polling logic.
+
+            # Refresh notebook state
+            self.refresh_notebook(self.current_notebook_id)
+
+            # Verify final ID exists
+            current_sources = self._get_sources(self.current_notebook_id)
+            if final_source_id and final_source_id in current_sources:
+                 return {"source_id": final_source_id, "status": "completed"}
+            elif not final_source_id:
+                 # Check if any new source appeared
+                 new_items = set(current_sources) - initial_sources
+                 if new_items:
+                     return {"source_id": list(new_items)[0], "status": "completed"}
+
+        if not final_source_id:
+             logger.debug("Source ID extraction failed. Attempting to poll for new source...")
+             try:
+                 new_source_id = self._poll_for_new_source(initial_sources)
+                 final_source_id = new_source_id
+             except TimeoutError:
+                 logger.warning("Ingestion polling timed out or source not found in list.")
+                 return {"source_id": None, "status": "unknown"}
+
+        return {"source_id": final_source_id, "status": "pending"}
+
+    def _poll_for_new_source(self, initial_sources: set) -> Optional[str]:
+        # Poll up to ~8 minutes
+        for i in PollPolicy.for_job("ingestion", timeout=500).start():
+            self.invalidate_snapshot()
+            current_sources = self._get_sources(self.current_notebook_id)
+            # Use logic to find diff
+            curr_set = set(current_sources)
+            new_items = curr_set - initial_sources
+            if new_items:
+                return list(new_items)[0]
+        raise TimeoutError("Ingestion timed out")
+
+    def _get_sources(self, notebook_id: str) -> list:
+        # Unfiltered: until a tool has run, suggestions may be all that reference a new source
+        return self._source_ids(self._get_all_artifacts(notebook_id, query=ALL_ARTIFACTS))
+
+    def get_ingestion_status(self, job_id: str) -> Dict:
+        # Check if job_id (source_id) exists in notebook sources
+        sources = self._get_sources(self.current_notebook_id)
+        status = "completed" if job_id in sources else "processing"
+        return {"job_id": job_id, "status": status}
+
+    def refresh_notebook(self, notebook_id: str) -> Dict:
+        self.current_notebook_id = notebook_id
+        # Call gArtLc to get fresh state (sources etc); later lookups this tick reuse it
+        self._get_all_artifacts(notebook_id, max_age=0)
+        return {"notebook_id": notebook_id, "status": "refreshed"}
+
+    def run_stdio_tool(self, notebook_id: Optional[str], tool_type: str, input_text: str, source_ids: Optional[list] = None, options: Optional[Dict] = None) -> Dict:
+        if notebook_id:
+            self.current_notebook_id = notebook_id
+
+        if not self.current_notebook_id:
+            raise ValueError("Notebook ID required")
+
+        self._tool_id(tool_type)
+
+        # Need Source IDs.
+        if not source_ids:
+             source_ids = self._get_sources(self.current_notebook_id)
+
+        if not source_ids:
+            raise ValueError("No sources in notebook to run tool on")
+
+        payload = self._tool_payload(tool_type, source_ids)
+
+        resp = self._execute_rpc("R7cb6c", payload)
+        self.invalidate_snapshot()
+
+        op_id = self._operation_id_from_response(resp)
+
+        return {"operation_id": op_id, "status": "PENDING"}
+
+    def run_stdio_tools(self, notebook_id: Optional[str], tool_types: List[str], source_ids: Optional[list] = None) -> Dict[str, Optional[str]]:
+        """
+        Starts several tools on the same sources in one batchexecute round trip.
+        Returns {tool_type: operation_id}, with None for tools that did not start.
+        """
+        if notebook_id:
+            self.current_notebook_id = notebook_id
+
+        if not self.current_notebook_id:
+            raise ValueError("Notebook ID required")
+
+        for tool_type in tool_types:
+            self._tool_id(tool_type)
+
+        if not source_ids:
+             source_ids = self._get_sources(self.current_notebook_id)
+
+        if not source_ids:
+            raise ValueError("No sources in notebook to run tool on")
+
+        batch = self.batch()
+        indexes = {tool_type: batch.add("R7cb6c", self._tool_payload(tool_type, source_ids)) for tool_type in tool_types}
+        results = batch.execute()
+        self.invalidate_snapshot()
+
+        return {tool_type: self._operation_id_from_response(results[i]) for tool_type, i in indexes.items()}
+
+    def _get_all_artifacts(self, notebook_id: str, max_age: Optional[float] = None,
+                           query: ArtifactQuery = ALL_ARTIFACTS, expect: Optional[str] = None) -> list:
+        """
+        gArtLc listing narrowed by `query`, reusing a fresh enough snapshot that covers it.
+        With `expect`, the lookup may also probe filter support (see _artifact_listings).
+        """
+        query = self._effective_query(query)
+        cached = self._cached_artifacts(notebook_id, max_age, query)
+        if cached is not None:
+            return cached
+
+        listings = self._artifact_listings(query, expect)
+        fetch = next(listings)
+        while True:
+            try:
+                fetch = listings.send(self._fetch_artifacts(notebook_id, fetch))
+            except StopIteration as done:
+                return done.value
+
+    def _fetch_artifacts(self, notebook_id: str, query: ArtifactQuery) -> list:
+        fetched_at = time.monotonic()
+        resp = self._execute_rpc("gArtLc", self._artifacts_payload(notebook_id, query))
+        return self._store_artifacts(notebook_id, fetched_at, resp, query)
+
+    def get_operation_status(self, operation_id: str, query: ArtifactQuery = GENERATED_ARTIFACTS) -> Dict:
+        if not self.current_notebook_id:
+             raise ValueError("Notebook ID required to check operation status")
+
+        # Operations started by R7cb6c are never suggestions
+        artifacts = self._get_all_artifacts(self.current_notebook_id, query=query, expect=operation_id)
+        return self._operation_status(artifacts, operation_id)
+
+    def wait_for_tool_execution(self, operation_id: str, tool_type: str, timeout: Optional[float] = None, policy: Optional[PollPolicy] = None) -> Dict:
+        """
+        Polls for the completion of a tool execution.
+        tool_type: "infographic", "summary", "audio_overview", "study_guide", etc.
+        Polling follows `policy` (default: PollPolicy.for_job(tool_type, timeout)).
+        Returns: { "status": "DONE", "operationId": ..., "data": ... }
+        or { "status": "TIMEOUT", ... } once the policy deadline passes.
+        """
+        logger.debug("wait_for_tool_execution (%s) started for %s", tool_type, operation_id)
+        policy = policy or PollPolicy.for_job(tool_type, timeout=timeout)
+        for result in self.wait_for_tools({operation_id: tool_type}, policy=policy):
+            return result
+
+    def wait_for_tools(self, operations: Dict[str, str], timeout: Optional[float] = None, policy: Optional[PollPolicy] = None) -> Iterator[Dict]:
+        """
+        Waits on several operations in the current notebook with one shared poll loop.
+        operations maps operation_id -> tool_type. Each tick fetches one snapshot for all
+        of them, and each result (as returned by wait_for_tool_execution, plus "toolType")
+        is yielded as soon as its operation finishes. Operations still unfinished at the
+        deadline are yielded with status TIMEOUT.
+        """
+        pending = dict(operations)
+        if policy is None:
+            # Paced by the slowest tool so its deadline covers the others
+            slowest = max(pending.values(), key=lambda t: EXPECTED_DURATIONS.get(t.lower(), 0))
+            policy = PollPolicy.for_job(slowest, timeout=timeout)
+        last_print = 0
+
+        for _ in policy.start():
+            # Each tick starts from a fresh snapshot of just the pending tool types, shared by the lookups below
+            self.invalidate_snapshot()
+            query = ArtifactQuery(types=[self._tool_id(tool_type) for tool_type in pending.values()])
+            for operation_id, tool_type in list(pending.items()):
+                result = self._check_tool(operation_id, tool_type, query)
+                if result:
+                    del pending[operation_id]
+                    yield result
+            if not pending:
+                return
+
+            if time.time() - last_print > 5:
+                logger.debug("Waiting on %s operation(s): %s", len(pending), ', '.join(pending.values()))
+                last_print = time.time()
+
+        for operation_id, tool_type in pending.items():
+            yield self._tool_timeout(operation_id, tool_type, policy)
+
+    def _check_tool(self, operation_id: str, tool_type: str, query: Optional[ArtifactQuery] = None) -> Optional[Dict]:
+        """
+        One poll of an operation against the current snapshot (see _tool_result).
+        `query` must cover tool_type (default: that type alone).
+        """
+        if not self.current_notebook_id:
+             raise ValueError("Notebook ID required to check operation status")
+        query = query or ArtifactQuery(types=[self._tool_id(tool_type)])
+        artifacts = self._get_all_artifacts(self.current_notebook_id, query=query, expect=operation_id)
+        return self._tool_result(artifacts, operation_id, tool_type)
+
+    def get_generated_artifact(self, notebook_id: str, tool_type: str, query: Optional[ArtifactQuery] = None,
+                               done_only: bool = False) -> Any:
+        """
+        Latest artifact of tool_type (see _artifact_data). `query` must cover tool_type
+        (default: that type alone).
+        """
+        self.current_notebook_id = notebook_id
+        artifacts = self._get_all_artifacts(notebook_id, query=query or ArtifactQuery(types=[self._tool_id(tool_type)]))
+        return self._artifact_data(artifacts, tool_type, done_only=done_only)
+
     # Deprecated but kept for compatibility if needed
     def get_generated_infographic(self, notebook_id: str) -> str:
         res = self.get_generated_artifact(notebook_id, "infographic")
         if not res:
             raise Exception("No infographic found")
         return res
+
+
+class RpcBatch:
+    """
+    Queues RPC calls and sends them in a single batchexecute round trip.
+
+        batch = client.batch()
+        first = batch.add("gArtLc", [[2], notebook_a, None])
+        second = batch.add("gArtLc", [[2], notebook_b, None])
+        results = batch.execute()
+        artifacts_a, artifacts_b = results[first], results[second]
+    """
+
+    def __init__(self, client: NotebookLMClient):
+        self.client = client
+        self.calls: List[Tuple[str, Any]] = []
+
+    def add(self, rpc_id: str, payload: Any) -> int:
+        self.calls.append((rpc_id, payload))
+        return len(self.calls) - 1
+
+    def execute(self) -> List[Any]:
+        calls, self.calls = self.calls, []
+        return self.client._execute_batch(calls)
@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Iterator, Optional
+
+import tracing
+
+# Rough time NotebookLM takes per job type, in seconds. Polling tightens around
+# these so typical results are noticed quickly without hammering slow ones.
+EXPECTED_DURATIONS = {
+    "ingestion": 45,
+    "summary": 30,
+    "study_guide": 45,
+    "mindmap": 45,
+    "timeline": 45,
+    "infographic": 90,
+    "slide_deck": 180,
+    "audio_overview": 300,
+}
+
+# Overall deadlines, as a multiple of the expected duration
+DEADLINE_FACTOR = 5
+DEFAULT_TIMEOUT = 600
+
+
+class PollPolicy:
+    """
+    Polling cadence shared by every wait loop: an overall deadline, exponential
+    backoff with jitter, and an optional expected duration. When the elapsed time
+    reaches ~80% of the expected duration the backoff resets to `initial`, so the
+    window where the result is most likely to land is polled most closely.
+
+        for attempt in PollPolicy.for_job("infographic").start():
+            if check():
+                break
+        else:
+            raise TimeoutError(...)
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, initial: float = 1.0, max_interval: float = 10.0,
+                 multiplier: float = 1.6, jitter: float = 0.2, expected: Optional[float] = None,
+                 initial_delay: float = 0.0):
+        self.timeout = timeout
+        self.initial = initial
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.expected = expected
+        self.initial_delay = initial_delay
+
+    @classmethod
+    def for_job(cls, job_type: str, timeout: Optional[float] = None, **kwargs) -> "PollPolicy":
+        """Policy tuned to a tool type ("infographic", "summary", ...) or "ingestion"."""
+        expected = EXPECTED_DURATIONS.get(job_type.lower())
+        if timeout is None:
+            timeout = expected * DEADLINE_FACTOR if expected else DEFAULT_TIMEOUT
+        return cls(timeout=timeout, expected=expected, **kwargs)
+
+    def start(self) -> "Poller":
+        return Poller(self)
+
+
+class Poller:
+    """One run of a PollPolicy. Iterating yields attempt numbers, sleeping between them."""
+
+    def __init__(self, policy: PollPolicy):
+        self.policy = policy
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + policy.timeout
+        self.attempt = 0
+        self._interval = policy.initial
+        self._tightened = policy.expected is None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def next_interval(self) -> float:
+        policy = self.policy
+        if not self._tightened and self.elapsed >= policy.expected * 0.8:
+            self._tightened = True
+            self._interval = policy.initial
+
+        interval = self._interval
+        self._interval = min(policy.max_interval, self._interval * policy.multiplier)
+        if policy.jitter:
+            interval *= random.uniform(1 - policy.jitter, 1 + policy.jitter)
+        return interval
+
+    def sleep(self) -> bool:
+        """Sleeps until the next attempt. Returns False (without sleeping) once the deadline has passed."""
+        remaining = self.remaining
+        if remaining <= 0:
+            return False
+        with tracing.span("poll_sleep"):
+            time.sleep(min(self.next_interval(), remaining))
+        return True
+
+    async def sleep_async(self) -> bool:
+        remaining = self.remaining
+        if remaining <= 0:
+            return False
+        with tracing.span("poll_sleep"):
+            await asyncio.sleep(min(self.next_interval(), remaining))
+        return True
+
+    async def __aiter__(self) -> AsyncIterator[int]:
+        if self.policy.initial_delay:
+            with tracing.span("poll_sleep"):
+                await asyncio.sleep(min(self.policy.initial_delay, self.remaining))
+        while True:
+            if self.attempt and (self.expired or not await self.sleep_async()):
+                return
+            yield self.attempt
+            self.attempt += 1
+
+    def __iter__(self) -> Iterator[int]:
+        if self.policy.initial_delay:
+            with tracing.span("poll_sleep"):
+                time.sleep(min(self.policy.initial_delay, self.remaining))
+        while True:
+            if self.attempt and (self.expired or not self.sleep()):
+                return
+            yield self.attempt
+            self.attempt += 1
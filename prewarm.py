@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from client_pool import ClientPool
+from metrics import PREWARMS
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_INGESTING = "ingesting"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+class _Prewarm:
+    def __init__(self, video_id: str, account: str):
+        self.video_id = video_id
+        self.account = account
+        self.created_at = time.time()
+        self.started = False
+        self.cancelled = False
+        self.future: Optional[Future] = None
+        self.notebook_id: Optional[str] = None
+        self.source_id: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return STATUS_FAILED
+        if self.source_id:
+            return STATUS_READY
+        return STATUS_INGESTING if self.started else STATUS_QUEUED
+
+
+class Prewarmer:
+    """
+    Speculatively ingests videos the user has opened, so that a later generation for
+    the same video and account skips notebook creation and add_source.
+
+    `ingest(youtube_url, headers, at_token)` does the work and returns (notebook_id,
+    source_id). Prewarming is bounded: at most `concurrency` ingestions run at once and
+    further requests are skipped rather than queued, each account may start
+    `hourly_budget` per hour, and at most `max_entries` videos are held (the oldest
+    ready one makes room for a new one). A source nobody claims within `ttl` seconds
+    is dropped, and cancel() drops one straight away, e.g. when its tab is closed.
+    The notebook is left in the account either way.
+    """
+
+    def __init__(self, ingest: Callable[[str, Dict, Optional[str]], Tuple[str, str]], concurrency: int = 2,
+                 max_entries: int = 16, hourly_budget: int = 20, ttl: float = 900):
+        self.ingest = ingest
+        self.concurrency = concurrency
+        self.max_entries = max_entries
+        self.hourly_budget = hourly_budget
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Prewarm]" = OrderedDict()
+        self._starts: Dict[str, Deque[float]] = {}
+        # Submitted ingestions not yet finished, including cancelled ones still running
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="prewarm")
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    def start(self, video_id: str, youtube_url: str, headers: Dict, at_token: Optional[str]) -> Dict:
+        """
+        Starts prewarming a video unless it is already prewarmed for this account or a
+        budget is exhausted. Returns {"status": ..., "reason": ...} (reason only when skipped).
+        """
+        if not self.enabled:
+            return self._skip("disabled")
+        account = ClientPool.account_key(headers, at_token)
+        now = time.time()
+
+        with self._lock:
+            self._expire_locked(now)
+            entry = self._entries.get(video_id)
+            if entry is not None:
+                if entry.account != account:
+                    return self._skip("prewarmed by another account")
+                if entry.status != STATUS_FAILED:
+                    return {"status": entry.status}
+                del self._entries[video_id]
+
+            if self._active >= self.concurrency:
+                return self._skip("busy")
+            starts = self._starts.setdefault(account, deque())
+            while starts and now - starts[0] > 3600:
+                starts.popleft()
+            if len(starts) >= self.hourly_budget:
+                return self._skip("hourly budget exhausted")
+            if len(self._entries) >= self.max_entries and not self._evict_ready_locked():
+                return self._skip("too many prewarmed videos")
+
+            entry = _Prewarm(video_id, account)
+            self._entries[video_id] = entry
+            starts.append(now)
+            self._active += 1
+            entry.future = self._executor.submit(self._run, entry, youtube_url, headers, at_token)
+        # Outside the lock: a future that is already done runs the callback right away
+        entry.future.add_done_callback(self._finished)
+
+        PREWARMS.inc(outcome="started")
+        logger.info("Prewarming %s", video_id)
+        return {"status": entry.status}
+
+    def claim(self, video_id: str, headers: Dict, at_token: Optional[str],
+              timeout: float = 60) -> Optional[Tuple[str, str]]:
+        """
+        Takes the prewarmed (notebook_id, source_id) for this video and account, waiting
+        up to `timeout` for an ingestion already under way. Returns None if there is
+        none; a prewarm that has not started yet is cancelled so the caller ingests
+        on its own.
+        """
+        account = ClientPool.account_key(headers, at_token)
+        with self._lock:
+            self._expire_locked(time.time())
+            entry = self._entries.get(video_id)
+            if entry is None or entry.account != account:
+                return None
+            del self._entries[video_id]
+            if not entry.started:
+                entry.cancelled = True
+                entry.future.cancel()
+                return None
+
+        try:
+            entry.future.result(timeout)
+        except (FutureTimeout, CancelledError):
+            entry.cancelled = True
+        except Exception:
+            pass
+        if entry.cancelled or not entry.source_id:
+            return None
+        PREWARMS.inc(outcome="claimed")
+        logger.info("Using prewarmed source %s for %s", entry.source_id, video_id)
+        return entry.notebook_id, entry.source_id
+
+    def cancel(self, video_id: str) -> bool:
+        """Drops a video's prewarm; one still ingesting finishes but is discarded. Returns False if there was none."""
+        with self._lock:
+            entry = self._entries.pop(video_id, None)
+        if entry is None:
+            return False
+        entry.cancelled = True
+        if entry.future is not None:
+            entry.future.cancel()
+        PREWARMS.inc(outcome="cancelled")
+        logger.info("Cancelled prewarm of %s", video_id)
+        return True
+
+    def _run(self, entry: _Prewarm, youtube_url: str, headers: Dict, at_token: Optional[str]):
+        with self._lock:
+            if entry.cancelled:
+                return
+            entry.started = True
+        try:
+            notebook_id, source_id = self.ingest(youtube_url, headers, at_token)
+        except Exception as e:
+            PREWARMS.inc(outcome="failed")
+            logger.warning("Prewarm of %s failed: %s", entry.video_id, e)
+            entry.error = str(e)
+            return
+        with self._lock:
+            entry.notebook_id, entry.source_id = notebook_id, source_id
+            entry.created_at = time.time()
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._active -= 1
+
+    def _expire_locked(self, now: float):
+        # The TTL runs from when the source became ready, or from the request if it never did
+        expired = [video_id for video_id, entry in self._entries.items()
+                   if entry.status in (STATUS_READY, STATUS_FAILED) and now - entry.created_at > self.ttl]
+        for video_id in expired:
+            entry = self._entries.pop(video_id)
+            if entry.status == STATUS_READY:
+                PREWARMS.inc(outcome="expired")
+
+    def _evict_ready_locked(self) -> bool:
+        for video_id, entry in self._entries.items():
+            if entry.status in (STATUS_READY, STATUS_FAILED):
+                del self._entries[video_id]
+                if entry.status == STATUS_READY:
+                    PREWARMS.inc(outcome="expired")
+                return True
+        return False
+
+    @staticmethod
+    def _skip(reason: str) -> Dict:
+        PREWARMS.inc(outcome="skipped")
+        return {"status": STATUS_SKIPPED, "reason": reason}
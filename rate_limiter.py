@@ -0,0 +1,119 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+# Lower runs first. Starting work (adding a source, running a tool) goes ahead of
+# polling, which can always wait for the next tick.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+# Speculative work (see prewarm.py), served only when nothing else is waiting
+PRIORITY_BACKGROUND = 3
+
+RPC_PRIORITIES = {
+    "izAoDd": PRIORITY_HIGH,
+    "R7cb6c": PRIORITY_HIGH,
+    "gArtLc": PRIORITY_LOW,
+}
+
+
+_background: "contextvars.ContextVar[bool]" = contextvars.ContextVar("rpc_background", default=False)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """RPCs made in the with-block (in this thread or task) queue behind every other call."""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def rpc_priority(rpc_ids: Iterable[str]) -> int:
+    """Priority of a batchexecute POST: that of its most urgent call, or PRIORITY_BACKGROUND under background_priority()."""
+    if _background.get():
+        return PRIORITY_BACKGROUND
+    return min((RPC_PRIORITIES.get(rpc_id, PRIORITY_NORMAL) for rpc_id in rpc_ids), default=PRIORITY_NORMAL)
+
+
+class RateLimiter:
+    """
+    Token bucket with a priority queue, shared by every client of one account.
+
+    Tokens refill at `rate` per second up to `burst`; each call takes one. Callers that
+    find the bucket empty queue by (priority, arrival), and only the head of the queue
+    waits for the next token, so a high-priority call arriving behind queued polls
+    is served first. `pause()` empties the bucket for a while, e.g. after a 429, so the
+    account backs off as a whole instead of every caller retrying on its own.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        if now < self._paused_until:
+            self._updated = now
+            return
+        start = max(self._updated, self._paused_until)
+        self._tokens = min(self.burst, self._tokens + (now - start) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> float:
+        """
+        Blocks until a token is available and takes it. Returns the time spent waiting.
+        Raises TimeoutError if `timeout` passes first.
+        """
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return now - started
+                        wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+                    else:
+                        # Woken when the head takes its token or leaves
+                        wait = None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise TimeoutError("Timed out waiting for the RPC rate limit")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Stops handing out tokens for `seconds` and empties the bucket."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._cond.notify_all()
+
+    @property
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._waiters)
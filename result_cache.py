@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+
+class ResultCache:
+    """
+    On-disk cache of generated artifacts, one JSON file per (video_id, tool).
+
+    Entries older than `max_age` seconds are ignored and removed on read. After each
+    write the oldest entries are evicted until the cache holds at most `max_entries`
+    files and `max_bytes` bytes.
+    """
+
+    def __init__(self, directory: str, max_age: float = 24 * 3600, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, video_id: str, tool_type: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.{tool_type.lower()}.json")
+
+    def get(self, video_id: str, tool_type: str) -> Optional[Any]:
+        path = self._path(video_id, tool_type)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.max_age:
+            self._remove(path)
+            return None
+        return entry.get("data")
+
+    def put(self, video_id: str, tool_type: str, data: Any):
+        entry = {
+            "video_id": video_id,
+            "tool_type": tool_type.lower(),
+            "created_at": time.time(),
+            "data": data,
+        }
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(video_id, tool_type))
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def delete(self, video_id: str, tool_type: str):
+        self._remove(self._path(video_id, tool_type))
+
+    def _evict(self):
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                total -= size
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
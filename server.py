@@ -1,132 +1,1192 @@
 import http.server
-import socketserver
+import argparse
+import contextlib
+import itertools
+import email.utils
 import json
+import logging
+import os
+import queue
+import random
+import signal
+import socket
+import threading
 import time
 import sys
 import traceback
-from notebooklm_client import NotebookLMClient
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from client_pool import ClientPool
+from result_cache import ResultCache
+from image_cache import ImageCache
+from singleflight import SingleFlight
+from jobs import (Job, JobManager, STAGE_NOTEBOOK_CREATED, STAGE_SOURCE_ADDED, STAGE_TOOL_RUNNING,
+                  TERMINAL_STAGES)
+from job_store import JobStore
+from youtube import extract_video_id
+from polling import PollPolicy
+from notebook_pool import NotebookPool, NOTEBOOK_TITLE
+from prewarm import Prewarmer
+from rate_limiter import background_priority
+from notebooklm_client import DEFAULT_HEADERS, TOOL_IDS
+from metrics import GENERATIONS, REGISTRY, STAGE_LATENCY, TOOL_LATENCY
+import tracing
 
 # Configuration from usage_example.py
 from usage_example import HEADERS, AT_TOKEN
 
 PORT = 8000
 
+logger = logging.getLogger(__name__)
+LOG_LEVEL = os.environ.get("NOTEBOOKLM_LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("NOTEBOOKLM_LOG_FORMAT", "text")
+
+# Concurrency limits. A sync generation, a request waiting on another's identical run
+# (a follower) and an open event or bulk stream each hold a worker thread throughout, so
+# their budgets together keep RESERVED_WORKERS free for preflights and errors (see
+# worker_budgets). NOTEBOOKLM_MAX_JOBS / NOTEBOOKLM_MAX_STREAMS override the derived
+# values; main() recomputes all of them from --workers.
+WORKERS = int(os.environ.get("NOTEBOOKLM_WORKERS", 32))
+MAX_JOBS_SETTING = int(os.environ.get("NOTEBOOKLM_MAX_JOBS", 0))
+MAX_STREAMS_SETTING = int(os.environ.get("NOTEBOOKLM_MAX_STREAMS", 0))
+QUEUE_SIZE = int(os.environ.get("NOTEBOOKLM_QUEUE_SIZE", 64))
+RESERVED_WORKERS = 4
+
+def worker_budgets(workers: int, max_jobs: int = 0, max_streams: int = 0) -> Tuple[int, int, int]:
+    """
+    (job slots, followers, streams) for `workers` HTTP workers: followers and streams get
+    an eighth each of the workers left after the reserve, and job slots the rest (at least
+    one each, so very small pools get a smaller reserve). Explicit max_jobs / max_streams
+    win even if they eat into the reserve, with a warning.
+    """
+    reserve = min(RESERVED_WORKERS, workers // 2)
+    available = max(3, workers - reserve)
+    followers = max(1, available // 8)
+    streams = max_streams or max(1, available // 8)
+    jobs = max_jobs or max(1, available - followers - streams)
+    if (max_jobs or max_streams) and jobs + followers + streams > workers - reserve:
+        logger.warning("%s job slots, %s followers and %s streams leave fewer than %s of %s workers free",
+                       jobs, followers, streams, reserve, workers)
+    return jobs, followers, streams
+
+MAX_JOBS, MAX_FOLLOWERS, MAX_STREAMS = worker_budgets(WORKERS, MAX_JOBS_SETTING, MAX_STREAMS_SETTING)
+job_slots = threading.BoundedSemaphore(MAX_JOBS)
+# Each /jobs/{id}/events stream and /generate-bulk response holds a worker until its work
+# finishes; past MAX_STREAMS, 503
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+# Deadline for a tool run once started (None: derived from the tool's expected duration)
+TOOL_TIMEOUT = float(os.environ.get("NOTEBOOKLM_TOOL_TIMEOUT", 0)) or None
+
+# How long a new source may take to accept tools (None: derived from expected ingestion time),
+# and how often tool start is retried while the source is not yet listed in the notebook
+SOURCE_READY_TIMEOUT = float(os.environ.get("NOTEBOOKLM_SOURCE_READY_TIMEOUT", 0)) or None
+TOOL_START_RETRY = 8.0
+
+# Clients are reused per cookie/at_token so repeat requests skip the homepage fetch. Each
+# account's batchexecute calls share a token bucket (0 disables it); see rate_limiter.py.
+client_pool = ClientPool(
+    max_accounts=int(os.environ.get("NOTEBOOKLM_POOL_ACCOUNTS", 32)),
+    params_ttl=float(os.environ.get("NOTEBOOKLM_PARAMS_TTL", 1800)),
+    rpc_rate=float(os.environ.get("NOTEBOOKLM_RPC_RATE", 2)),
+    rpc_burst=float(os.environ.get("NOTEBOOKLM_RPC_BURST", 6)),
+)
+
+# Pre-created empty notebooks per account, so generations skip create_notebook
+notebook_pool = NotebookPool(client_pool, target_size=int(os.environ.get("NOTEBOOKLM_WARM_NOTEBOOKS", 1)))
+
+# Finished artifacts per (video_id, tool), checked before any RPC is made
+result_cache = ResultCache(
+    os.environ.get("NOTEBOOKLM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "notebooklm-infographic", "results")),
+    max_age=float(os.environ.get("NOTEBOOKLM_CACHE_MAX_AGE", 24 * 3600)),
+    max_entries=int(os.environ.get("NOTEBOOKLM_CACHE_MAX_ENTRIES", 1000)),
+)
+
+# Infographic images, fetched once and served from /artifacts/{video_id}/image. Only the
+# User-Agent is sent: the account cookie belongs to google.com, not the image host.
+image_cache = ImageCache(
+    os.environ.get("NOTEBOOKLM_IMAGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "notebooklm-infographic", "images")),
+    max_entries=int(os.environ.get("NOTEBOOKLM_IMAGE_CACHE_MAX_ENTRIES", 1000)),
+    max_bytes=int(os.environ.get("NOTEBOOKLM_IMAGE_CACHE_MAX_BYTES", 200 * 1024 * 1024)),
+    headers={"User-Agent": DEFAULT_HEADERS["User-Agent"]},
+)
+IMAGE_MAX_AGE = 3600
+# Images of fresh generations are downloaded in the background so the first view is local too
+image_prefetch = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-prefetch")
+
+# Speculative ingestion of videos the extension reports as opened (POST /prewarm), so the
+# generation that may follow starts with its source already added. Prewarm RPCs queue
+# behind all other calls; NOTEBOOKLM_PREWARM_CONCURRENCY=0 disables prewarming.
+prewarmer = Prewarmer(
+    lambda youtube_url, req_headers, req_token: prewarm_video(youtube_url, req_headers, req_token),
+    concurrency=int(os.environ.get("NOTEBOOKLM_PREWARM_CONCURRENCY", 2)),
+    max_entries=int(os.environ.get("NOTEBOOKLM_PREWARM_MAX_ENTRIES", 16)),
+    hourly_budget=int(os.environ.get("NOTEBOOKLM_PREWARM_HOURLY", 20)),
+    ttl=float(os.environ.get("NOTEBOOKLM_PREWARM_TTL", 900)),
+)
+# How long a generation waits for a prewarm that is still adding its source
+PREWARM_CLAIM_TIMEOUT = 60
+
+# Identical (video_id, tool) requests share one pipeline run. A sync request that joins
+# another's run blocks a worker without holding a job slot, so only MAX_FOLLOWERS may wait at once.
+inflight = SingleFlight()
+
+# Background jobs for the /jobs API; they share job_slots with the sync endpoint. Jobs are
+# recorded in SQLite (unless NOTEBOOKLM_JOB_DB is empty) and resumed on startup. main()
+# builds job_manager once --max-jobs and --queue-size are known.
+JOB_DB = os.environ.get("NOTEBOOKLM_JOB_DB", os.path.join(os.path.expanduser("~"), ".cache", "notebooklm-infographic", "jobs.sqlite3"))
+job_manager: Optional[JobManager] = None
+SSE_HEARTBEAT = 15
+
+# Bulk requests run this many videos at once by default (and at most BULK_MAX_CONCURRENCY);
+# every video still takes a job slot, so bulk work shares the global limit
+BULK_CONCURRENCY = int(os.environ.get("NOTEBOOKLM_BULK_CONCURRENCY", 4))
+BULK_MAX_CONCURRENCY = int(os.environ.get("NOTEBOOKLM_BULK_MAX_CONCURRENCY", 16))
+BULK_MAX_URLS = int(os.environ.get("NOTEBOOKLM_BULK_MAX_URLS", 500))
+
+# Opt-in profiling: with NOTEBOOKLM_PROFILE_DIR set, generations requested with an
+# "X-Profile: 1" header, plus a random NOTEBOOKLM_PROFILE_SAMPLE fraction of the rest,
+# run under cProfile and leave a .prof file there (see tracing.profile_to)
+PROFILE_DIR = os.environ.get("NOTEBOOKLM_PROFILE_DIR") or None
+PROFILE_SAMPLE = float(os.environ.get("NOTEBOOKLM_PROFILE_SAMPLE", 0))
+
+# Server processes sharing the port (see serve_processes); 1 serves from this process
+PROCESSES = int(os.environ.get("NOTEBOOKLM_PROCESSES", 1))
+
+class ServerBusy(Exception):
+    pass
+
+def prefetch_image(video_id: str, image_url: str):
+    def run():
+        try:
+            image_cache.get(video_id, image_url)
+        except Exception as e:
+            logger.warning("Image prefetch failed for %s: %s", video_id, e)
+    image_prefetch.submit(run)
+
+def image_path(video_id: str) -> str:
+    return f"/artifacts/{video_id}/image"
+
+def profiled(label: str, requested: bool = False):
+    """Context that profiles the block when profiling is enabled and the request asked for it or is sampled."""
+    if PROFILE_DIR and (requested or random.random() < PROFILE_SAMPLE):
+        return tracing.profile_to(PROFILE_DIR, label)
+    return contextlib.nullcontext()
+
+def ingest_video(client, youtube_url: str, report: Optional[Callable] = None,
+                 notebook_id: Optional[str] = None, source_id: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Creates a notebook (or uses the warm notebook_id) and adds the video as a source.
+    Returns (notebook_id, source_id). Given both IDs (a prewarmed source) it only reports them.
+    """
+    report = report or (lambda stage, **info: None)
+
+    if notebook_id and source_id:
+        report(STAGE_NOTEBOOK_CREATED, notebook_id=notebook_id, prewarmed=True)
+        report(STAGE_SOURCE_ADDED, source_id=source_id, prewarmed=True)
+        return notebook_id, source_id
+
+    # 1. Create Notebook (unless a warm one was supplied)
+    if notebook_id:
+        nb_id = notebook_id
+    else:
+        logger.info("Creating Notebook...")
+        with STAGE_LATENCY.time(stage=STAGE_NOTEBOOK_CREATED), tracing.span("create_notebook"):
+            nb_id = client.create_notebook(NOTEBOOK_TITLE)['notebook_id']
+    logger.info("Notebook ID: %s", nb_id)
+    report(STAGE_NOTEBOOK_CREATED, notebook_id=nb_id)
+
+    # 2. Add Source. Fresh and warm notebooks start out empty, so no baseline fetch is needed.
+    logger.info("Adding Source...")
+    with STAGE_LATENCY.time(stage=STAGE_SOURCE_ADDED), tracing.span("add_source"):
+        try:
+            source_res = client.add_source(nb_id, "URL", json.dumps({"url": youtube_url}), known_sources=[])
+        except Exception as e:
+            if not notebook_id:
+                raise
+            # The warm notebook may have been deleted since it was created
+            logger.warning("Warm notebook %s unusable (%s). Creating a new one...", nb_id, e)
+            nb_id = client.create_notebook(NOTEBOOK_TITLE)['notebook_id']
+            report(STAGE_NOTEBOOK_CREATED, notebook_id=nb_id)
+            source_res = client.add_source(nb_id, "URL", json.dumps({"url": youtube_url}), known_sources=[])
+        source_id = source_res.get("source_id")
+
+        if not source_id:
+             # Fallback
+             sources = client._get_sources(nb_id)
+             if sources:
+                 source_id = sources[0]
+
+        if not source_id:
+            raise Exception("Failed to add source or retrieve source ID")
+
+    logger.info("Source ID: %s", source_id)
+    report(STAGE_SOURCE_ADDED, source_id=source_id)
+    return nb_id, source_id
+
+def start_tools(client, nb_id: str, source_id: str, tool_types: List[str],
+                report: Optional[Callable] = None) -> Dict[str, str]:
+    """
+    Starts every tool on the source and returns {operation_id: tool_type}.
+
+    The first attempt is made straight away. If the source is not usable yet, the
+    notebook is polled and the tools are retried as soon as the source shows up in
+    it, with a blind retry every TOOL_START_RETRY seconds in case it never does.
+    """
+    report = report or (lambda stage, **info: None)
+
+    # Tools are started together in one batchexecute call; retries only resend the missing ones
+    logger.info("Running tools: %s...", ', '.join(tool_types))
+    operations = {}
+    missing = list(tool_types)
+    last_attempt = 0.0
+    attempts_when_ready = 0
+    with STAGE_LATENCY.time(stage=STAGE_TOOL_RUNNING), tracing.span("start_tools"):
+        for attempt in PollPolicy.for_job("ingestion", timeout=SOURCE_READY_TIMEOUT, initial=1.0, max_interval=4.0).start():
+             ready = False
+             if attempt:
+                 client.invalidate_snapshot()
+                 ready = client.get_ingestion_status(source_id)["status"] == "completed"
+                 if not ready and time.monotonic() - last_attempt < TOOL_START_RETRY:
+                     continue
+
+             started = client.run_stdio_tools(nb_id, missing, source_ids=[source_id])
+             last_attempt = time.monotonic()
+             operations.update({op_id: tool_type for tool_type, op_id in started.items() if op_id})
+             missing = [tool_type for tool_type, op_id in started.items() if not op_id]
+             if not missing:
+                 break
+
+             # A ready source that still refuses the tool is not going to accept it later
+             if ready:
+                 attempts_when_ready += 1
+                 if attempts_when_ready >= 3:
+                     break
+
+        if missing:
+            raise Exception(f"Failed to start {', '.join(missing)} generation (no operation ID)")
+
+    logger.info("Operation IDs: %s", operations)
+    # Wall-clock, so the deadline still means something to a restarted server (see resume_infographic)
+    deadline = time.time() + max(PollPolicy.for_job(tool_type, timeout=TOOL_TIMEOUT).timeout
+                                 for tool_type in operations.values())
+    report(STAGE_TOOL_RUNNING, operation_ids=operations, deadline=deadline)
+    return operations
+
+def generate_infographic(client, youtube_url: str, report: Optional[Callable] = None,
+                         notebook_id: Optional[str] = None, source_id: Optional[str] = None) -> str:
+    """
+    Runs the notebook -> source -> infographic pipeline and returns the image URL.
+    report(stage, **info) is called as each stage completes. If notebook_id is given
+    (a warm notebook from notebook_pool) it is used instead of creating one, and with
+    source_id too (a prewarmed source) the pipeline starts at the tool.
+    """
+    nb_id, source_id = ingest_video(client, youtube_url, report=report, notebook_id=notebook_id, source_id=source_id)
+
+    # 3. Run Infographic Tool
+    [op_id] = start_tools(client, nb_id, source_id, ["infographic"], report=report)
+
+    # 4. Wait for Result
+    return wait_for_infographic(client, op_id)
+
+def wait_for_infographic(client, op_id: str, timeout: Optional[float] = TOOL_TIMEOUT) -> str:
+    """Polls a started infographic operation in the client's current notebook and returns the image URL."""
+    logger.info("Waiting for completion...")
+    image_url = None
+    started = time.monotonic()
+    with tracing.span("wait_for_tool"):
+        result = client.wait_for_tool_execution(op_id, "infographic", timeout=timeout)
+    TOOL_LATENCY.observe(time.monotonic() - started, tool_type="infographic", outcome=result.get("status", "").lower())
+    if result.get("status") == "DONE":
+        image_url = result.get('data')
+
+    if not image_url:
+        raise Exception("Timed out or failed to generate image")
+
+    return image_url
+
+def resume_infographic(client, youtube_url: str, record: Dict, report: Optional[Callable] = None) -> str:
+    """
+    Continues a job recorded by a previous server process from the furthest point it
+    reached: polls its operation if the tool was started, starts the tool if the source
+    was added, and otherwise runs the pipeline again (in the recorded notebook, if any).
+    """
+    nb_id, source_id, op_id = record.get("notebook_id"), record.get("source_id"), record.get("operation_id")
+    if op_id and nb_id:
+        # Past the deadline this is a single check, in case it finished while the server was down
+        remaining = max(0.0, (record.get("deadline") or 0) - time.time())
+        logger.info("Resuming infographic operation %s (%.0fs left)", op_id, remaining)
+        client.current_notebook_id = nb_id
+        return wait_for_infographic(client, op_id, timeout=remaining)
+    if source_id and nb_id:
+        logger.info("Resuming infographic job at source %s", source_id)
+        [op_id] = start_tools(client, nb_id, source_id, ["infographic"], report=report)
+        return wait_for_infographic(client, op_id)
+    return generate_infographic(client, youtube_url, report=report, notebook_id=nb_id)
+
+def generate_tools(client, youtube_url: str, tool_types: List[str], report: Optional[Callable] = None,
+                   notebook_id: Optional[str] = None, source_id: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Ingests the video once (or uses a prewarmed source_id), starts every tool in tool_types
+    against the same source and yields each tool's result (see NotebookLMClient.wait_for_tools)
+    as it finishes.
+    """
+    nb_id, source_id = ingest_video(client, youtube_url, report=report, notebook_id=notebook_id, source_id=source_id)
+    operations = start_tools(client, nb_id, source_id, tool_types, report=report)
+
+    logger.info("Waiting for completion...")
+    started = time.monotonic()
+    for result in client.wait_for_tools(operations, timeout=TOOL_TIMEOUT):
+        TOOL_LATENCY.observe(time.monotonic() - started, tool_type=result["toolType"], outcome=result["status"].lower())
+        yield result
+
+def prewarm_video(youtube_url: str, req_headers: Dict, req_token: str) -> Tuple[str, str]:
+    """Prewarmer callback: adds the video to a warm (or new) notebook at background RPC priority."""
+    with background_priority():
+        warm_notebook_id = notebook_pool.take(req_headers, req_token)
+        with client_pool.client(req_headers, req_token) as client:
+            return ingest_video(client, youtube_url, notebook_id=warm_notebook_id)
+
+def claim_notebook(video_id: str, req_headers: Dict, req_token: str) -> Tuple[Optional[str], Optional[str]]:
+    """(notebook_id, source_id) to generate in: the video's prewarmed source, else a warm notebook and no source."""
+    with tracing.span("prewarm_claim"):
+        prewarmed = prewarmer.claim(video_id, req_headers, req_token, timeout=PREWARM_CLAIM_TIMEOUT)
+    if prewarmed:
+        return prewarmed
+    with tracing.span("notebook_pool"):
+        return notebook_pool.take(req_headers, req_token), None
+
+def valid_auth(data: Dict) -> bool:
+    """False if the body has an `auth` object without string cookie and at_token."""
+    if 'auth' not in data:
+        return True
+    auth = data['auth']
+    return isinstance(auth, dict) and isinstance(auth.get('cookie'), str) and isinstance(auth.get('at_token'), str)
+
+def resolve_auth(data: Dict) -> Tuple[Dict, str]:
+    # Logic from usage_example.py
+    req_headers = HEADERS.copy()
+    req_token = AT_TOKEN
+    
+    if 'auth' in data:
+        logger.info("Using authentication from request")
+        req_headers['cookie'] = data['auth'].get('cookie')
+        req_token = data['auth'].get('at_token')
+        logger.debug("Cookie received: %s...", req_headers['cookie'][:20])
+        logger.debug("Token received: %s...", req_token[:20])
+    else:
+        logger.info("Using hardcoded authentication")
+        logger.debug("Hardcoded Cookie prefix: %s...", req_headers.get('cookie', '')[:20])
+
+    return req_headers, req_token
+
+def produce_infographic(video_id: str, youtube_url: str, req_headers: Dict, req_token: str,
+                        report: Optional[Callable] = None, wait_for_slot: bool = False,
+                        resume: Optional[Dict] = None) -> Tuple[str, bool]:
+    """
+    Cache-aware, coalesced infographic generation shared by the sync and job endpoints.
+    With `resume` (a JobStore record) the run continues that job instead of starting over.
+    Returns (image_url, shared). Without wait_for_slot, raises ServerBusy if no job slot is
+    free or MAX_FOLLOWERS callers are already waiting on other requests' runs.
+    """
+    def run():
+        # Another request may have finished this video since the caller's cache check
+        cached = result_cache.get(video_id, "infographic")
+        if cached:
+            GENERATIONS.inc(tool_type="infographic", outcome="cached")
+            return cached
+        with tracing.span("job_slot"):
+            if not job_slots.acquire(blocking=wait_for_slot):
+                raise ServerBusy("Server busy, too many generations in progress")
+        try:
+            if resume:
+                with client_pool.client(req_headers, req_token) as client:
+                    image_url = resume_infographic(client, youtube_url, resume, report=report)
+            else:
+                notebook_id, source_id = claim_notebook(video_id, req_headers, req_token)
+                with client_pool.client(req_headers, req_token) as client:
+                    image_url = generate_infographic(client, youtube_url, report=report, notebook_id=notebook_id,
+                                                     source_id=source_id)
+            result_cache.put(video_id, "infographic", image_url)
+            prefetch_image(video_id, image_url)
+            GENERATIONS.inc(tool_type="infographic", outcome="done")
+            return image_url
+        except Exception:
+            GENERATIONS.inc(tool_type="infographic", outcome="failed")
+            raise
+        finally:
+            job_slots.release()
+
+    try:
+        return inflight.do((video_id, "infographic"), run, max_waiters=None if wait_for_slot else MAX_FOLLOWERS)
+    except OverflowError:
+        raise ServerBusy("Server busy, too many requests waiting for the same generations")
+
+def resume_job(job: Job, record: Dict) -> str:
+    """JobManager.resume callback: finishes an infographic job left unfinished by a previous process."""
+    auth = record.get("auth") or {}
+    if record["tool_type"] != "infographic" or not auth or not record.get("youtube_url"):
+        raise Exception("Job cannot be resumed after a restart")
+    image_url, _ = produce_infographic(record["video_id"], record["youtube_url"], auth.get("headers") or {},
+                                       auth.get("at_token"), report=job.report, wait_for_slot=True, resume=record)
+    return image_url
+
+def produce_tools(video_id: str, youtube_url: str, tool_types: List[str], req_headers: Dict,
+                  req_token: str) -> Iterator[Dict]:
+    """
+    Generates several tools for one video on a single notebook and source, yielding
+    {video_id, tool_type, status, data | error} per tool as each finishes. Successful
+    results are stored in the result cache. The caller must hold a job slot.
+    """
+    remaining = list(tool_types)
+    try:
+        notebook_id, source_id = claim_notebook(video_id, req_headers, req_token)
+        with client_pool.client(req_headers, req_token) as client:
+            for result in generate_tools(client, youtube_url, tool_types, notebook_id=notebook_id, source_id=source_id):
+                tool_type = result["toolType"]
+                remaining.remove(tool_type)
+                if result.get("status") == "DONE" and result.get("data"):
+                    result_cache.put(video_id, tool_type, result["data"])
+                    if tool_type == "infographic":
+                        prefetch_image(video_id, result["data"])
+                    GENERATIONS.inc(tool_type=tool_type, outcome="done")
+                    yield {"video_id": video_id, "tool_type": tool_type, "status": "DONE", "data": result["data"]}
+                else:
+                    GENERATIONS.inc(tool_type=tool_type, outcome="timeout" if result.get("status") == "TIMEOUT" else "failed")
+                    yield {"video_id": video_id, "tool_type": tool_type, "status": "FAILED",
+                           "error": result.get("error") or "No artifact data"}
+    except Exception as e:
+        logger.error("Generation failed for %s: %s", video_id, e)
+        for tool_type in remaining:
+            GENERATIONS.inc(tool_type=tool_type, outcome="failed")
+            yield {"video_id": video_id, "tool_type": tool_type, "status": "FAILED", "error": str(e)}
+
+def produce_video(youtube_url: str, tool_types: List[str], req_headers: Dict, req_token: str) -> Dict:
+    """
+    Generates tool_types for one video of a bulk request, waiting for a job slot if needed.
+    Returns {youtube_url, video_id, status, results: {tool: data}, errors: {tool: error}}.
+    """
+    video_id = extract_video_id(youtube_url)
+    item = {"youtube_url": youtube_url, "video_id": video_id}
+    if not video_id:
+        return {**item, "status": "FAILED", "results": {}, "errors": {}, "error": "Invalid YouTube URL"}
+
+    results, errors = {}, {}
+    if tool_types == ["infographic"]:
+        # Shares in-flight runs with the single-video endpoints
+        try:
+            results["infographic"], _ = produce_infographic(video_id, youtube_url, req_headers, req_token,
+                                                            wait_for_slot=True)
+        except Exception as e:
+            errors["infographic"] = str(e)
+    else:
+        missing = []
+        for tool_type in tool_types:
+            cached = result_cache.get(video_id, tool_type)
+            if cached is None:
+                missing.append(tool_type)
+            else:
+                GENERATIONS.inc(tool_type=tool_type, outcome="cached")
+                results[tool_type] = cached
+        if missing:
+            job_slots.acquire()
+            try:
+                for result in produce_tools(video_id, youtube_url, missing, req_headers, req_token):
+                    if result["status"] == "DONE":
+                        results[result["tool_type"]] = result["data"]
+                    else:
+                        errors[result["tool_type"]] = result["error"]
+            finally:
+                job_slots.release()
+
+    return {**item, "status": "FAILED" if errors else "DONE", "results": results, "errors": errors}
+
+def _etag_listed(header: str, etag: str) -> bool:
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags)
+
+def _parse_http_date(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(email.utils.parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def _parse_range(header: str, size: int):
+    """
+    (start, end) for a single `bytes=` range, None to ignore the header (multiple ranges,
+    other units, bad syntax) and serve the whole body, or False if it cannot be satisfied.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
 class RequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        # Access log goes through logging instead of straight to stderr
+        logger.info("%s %s", self.address_string(), format % args)
+
     def do_OPTIONS(self):
         self.send_response(200, "ok")
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header("Access-Control-Allow-Headers", "X-Requested-With, Content-type")
+        self.send_header('Access-Control-Allow-Methods', 'GET, HEAD, POST, DELETE, OPTIONS')
+        self.send_header("Access-Control-Allow-Headers", "X-Requested-With, Content-type, X-Profile")
         self.end_headers()
 
-    def do_POST(self):
-        if self.path == '/generate-infographic':
-            try:
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-                
-                youtube_url = data.get('youtube_url')
-                if not youtube_url:
-                    self.send_error(400, "Missing youtube_url")
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode('utf-8'))
+
+    def _send_text(self, status: int, text: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-type', 'text/plain')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(text.encode('utf-8'))
+
+    def _start_ndjson(self):
+        """Starts a newline-delimited JSON response; lines are written with _write_ndjson as results arrive."""
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+    def _write_ndjson(self, payload) -> bool:
+        """Writes one line. Returns False once the client has gone away."""
+        try:
+            self.wfile.write(json.dumps(payload).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            return True
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+
+    def _read_json(self) -> Dict:
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        return json.loads(post_data.decode('utf-8'))
+
+    def _parse_generation_request(self) -> Optional[Tuple[Dict, str, str]]:
+        """Reads and validates a generation request body. Sends a 400 and returns None if invalid."""
+        try:
+            data = self._read_json()
+        except (TypeError, ValueError):
+            self.send_error(400, "Invalid JSON body")
+            return None
+
+        youtube_url = data.get('youtube_url')
+        if not youtube_url:
+            self.send_error(400, "Missing youtube_url")
+            return None
+
+        if not valid_auth(data):
+            self.send_error(400, "auth must include cookie and at_token")
+            return None
+
+        logger.info("Received request for URL: %s", youtube_url)
+
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            self.send_error(400, "Invalid YouTube URL")
+            return None
+
+        return data, youtube_url, video_id
+
+    def _parse_tools(self, tool_types: Any) -> Optional[List[str]]:
+        """Validates a request's tools list (deduplicated, lowercased). Sends a 400 and returns None if invalid."""
+        if not isinstance(tool_types, list) or not tool_types or not all(isinstance(t, str) for t in tool_types):
+            self.send_error(400, "tools must be a non-empty list of tool names")
+            return None
+        tool_types = list(dict.fromkeys(t.lower() for t in tool_types))
+        unknown = [t for t in tool_types if t not in TOOL_IDS]
+        if unknown:
+            self.send_error(400, f"Unknown tools: {', '.join(unknown)}")
+            return None
+        return tool_types
+
+    def _profile_requested(self) -> bool:
+        return self.headers.get('X-Profile', '').strip().lower() in ('1', 'true', 'yes')
+
+    @staticmethod
+    def _timing_headers(trace: tracing.Trace, headers: Optional[Dict] = None) -> Dict:
+        # Timing-Allow-Origin lets the extension's pages read Server-Timing cross-origin
+        return {**(headers or {}), 'Server-Timing': trace.server_timing(), 'Timing-Allow-Origin': '*'}
+
+    def do_GET(self):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+
+        if parts == ['metrics']:
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', REGISTRY.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif len(parts) == 3 and parts[0] == 'artifacts' and parts[2] == 'image':
+            self._serve_image(parts[1])
+        elif len(parts) >= 2 and parts[0] == 'jobs':
+            job = job_manager.get(parts[1])
+            if not job:
+                self.send_error(404, "Unknown job")
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif len(parts) == 3 and parts[2] == 'events':
+                if not stream_slots.acquire(blocking=False):
+                    self._send_text(503, "Too many event streams open, poll /jobs/{id} instead", {'Retry-After': '10'})
                     return
+                try:
+                    self._stream_job_events(job)
+                finally:
+                    stream_slots.release()
+            else:
+                self.send_error(404)
+        else:
+            self.send_error(404)
 
-                print(f"Received request for URL: {youtube_url}")
-                
-                 # Logic from usage_example.py
-                req_headers = HEADERS.copy()
-                req_token = AT_TOKEN
-                
-                if 'auth' in data:
-                    print("Using authentication from request")
-                    req_headers['cookie'] = data['auth'].get('cookie')
-                    req_token = data['auth'].get('at_token')
-                    print(f"DEBUG: Cookie received: {req_headers['cookie'][:20]}...")
-                    print(f"DEBUG: Token received: {req_token[:20]}...")
-                else:
-                    print("Using hardcoded authentication")
-                    print(f"DEBUG: Hardcoded Cookie prefix: {req_headers.get('cookie', '')[:20]}...")
-
-                client = NotebookLMClient(headers=req_headers, at_token=req_token)
-                
-                # 1. Create Notebook
-                print("Creating Notebook...")
-                nb = client.create_notebook("Infographic Gen")
-                nb_id = nb['notebook_id']
-                print(f"Notebook ID: {nb_id}")
-
-                # 2. Add Source
-                print("Adding Source...")
-                source_res = client.add_source(nb_id, "URL", json.dumps({"url": youtube_url}))
-                source_id = source_res.get("source_id")
-                
-                if not source_id:
-                     # Fallback
-                     sources = client._get_sources(nb_id)
-                     if sources:
-                         source_id = sources[0]
-                
-                if not source_id:
-                    raise Exception("Failed to add source or retrieve source ID")
-                
-                print(f"Source ID: {source_id}")
-                
-                # Wait for ingestion/stabilization
-                time.sleep(5) 
-
-                # 3. Run Infographic Tool
-                print("Running Infographic Tool...")
-                op_id = None
-                for attempt in range(3):
-                     tool_res = client.run_stdio_tool(nb_id, "infographic", "", source_ids=[source_id])
-                     op_id = tool_res.get("operation_id")
-                     if op_id:
-                         break
-                     time.sleep(2)
-                
-                if not op_id:
-                    raise Exception("Failed to start infographic generation (no operation ID)")
-                
-                print(f"Operation ID: {op_id}")
-
-                # 4. Wait for Result
-                print("Waiting for completion...")
-                image_url = None
-                # Polling
-                for _ in range(30): # 30 * 2 = 60 seconds max
-                    result = client.wait_for_tool_execution(op_id, "infographic")
-                    if result.get("status") == "DONE":
-                        image_url = result.get('data')
-                        break
-                    time.sleep(2)
-                
-                if not image_url:
-                    raise Exception("Timed out or failed to generate image")
-                
-                print(f"Success! Image URL: {image_url}")
-
-                # Send Response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
+    def do_HEAD(self):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        if len(parts) == 3 and parts[0] == 'artifacts' and parts[2] == 'image':
+            self._serve_image(parts[1], head=True)
+        else:
+            self.send_error(404)
+
+    def _serve_image(self, video_id: str, head: bool = False):
+        """
+        Cached infographic image for a video, fetched from Google on first use. Supports
+        conditional requests (304 on a matching If-None-Match / If-Modified-Since) and a
+        single byte range.
+        """
+        # Only bare video IDs: the ID becomes a file name in the image cache
+        if extract_video_id(video_id) != video_id:
+            self.send_error(404)
+            return
+        try:
+            # The result cache has the current URL; after it expires the image cache still has its own copy
+            image = image_cache.get(video_id, result_cache.get(video_id, "infographic"))
+        except Exception as e:
+            logger.warning("Image fetch failed for %s: %s", video_id, e)
+            self.send_error(502, "Could not fetch image")
+            return
+        if image is None:
+            self.send_error(404, "No image for this video")
+            return
+
+        etag = f'"{image.digest}"'
+        headers = {
+            'ETag': etag,
+            'Last-Modified': email.utils.formatdate(image.fetched_at, usegmt=True),
+            'Cache-Control': f'public, max-age={IMAGE_MAX_AGE}',
+            'Accept-Ranges': 'bytes',
+            'Access-Control-Allow-Origin': '*',
+        }
+
+        if self._not_modified(etag, image.fetched_at):
+            self.send_response(304)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            return
+
+        start, end = 0, image.size - 1
+        status = 200
+        byte_range = self.headers.get('Range')
+        if byte_range and self._if_range_matches(etag, image.fetched_at):
+            parsed = _parse_range(byte_range, image.size)
+            if parsed is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{image.size}')
+                self.send_header('Content-Length', '0')
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
-                response = {"image_url": image_url}
-                self.wfile.write(json.dumps(response).encode('utf-8'))
-                
+                return
+            if parsed is not None:
+                start, end = parsed
+                status = 206
+                headers['Content-Range'] = f'bytes {start}-{end}/{image.size}'
+
+        try:
+            f = open(image.path, 'rb')
+        except OSError:
+            # Evicted between lookup and open
+            self.send_error(503, "Image cache busy, retry")
+            return
+        with f:
+            self.send_response(status)
+            self.send_header('Content-type', image.content_type)
+            self.send_header('Content-Length', str(end - start + 1))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if head:
+                return
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(64 * 1024, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def _not_modified(self, etag: str, last_modified: float) -> bool:
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match takes precedence; weak comparison as for GET
+            return _etag_listed(if_none_match, etag)
+        since = _parse_http_date(self.headers.get('If-Modified-Since'))
+        return since is not None and int(last_modified) <= since
+
+    def _if_range_matches(self, etag: str, last_modified: float) -> bool:
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if if_range.strip().startswith(('"', 'W/')):
+            # Strong comparison: a weak tag never matches
+            return if_range.strip() == etag
+        return _parse_http_date(if_range) == int(last_modified)
+
+    def do_POST(self):
+        if self.path == '/generate-infographic':
+            parsed = self._parse_generation_request()
+            if not parsed:
+                return
+            data, youtube_url, video_id = parsed
+            trace = tracing.Trace()
+
+            # Served from disk before any RPC or job slot is needed
+            cached_url = result_cache.get(video_id, "infographic")
+            if cached_url:
+                logger.info("Cache hit for %s: %s", video_id, cached_url)
+                GENERATIONS.inc(tool_type="infographic", outcome="cached")
+                self._send_json(200, {"image_url": cached_url, "local_image_url": image_path(video_id), "cached": True},
+                                self._timing_headers(trace))
+                return
+
+            try:
+                req_headers, req_token = resolve_auth(data)
+                with tracing.activate(trace), profiled(video_id, self._profile_requested()):
+                    image_url, shared = produce_infographic(video_id, youtube_url, req_headers, req_token)
+                if shared:
+                    logger.info("Attached to in-flight generation for %s", video_id)
+
+                logger.info("Success! Image URL: %s", image_url)
+                self._send_json(200, {"image_url": image_url, "local_image_url": image_path(video_id)},
+                                self._timing_headers(trace))
+
+            except ServerBusy as e:
+                self._send_text(503, str(e), self._timing_headers(trace, {'Retry-After': '10'}))
             except Exception as e:
-                print(f"Error: {e}")
-                self.send_response(500)
-                self.send_header('Content-type', 'text/plain')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(str(e).encode('utf-8'))
+                logger.error("Generation failed for %s: %s", video_id, e)
+                self._send_text(500, str(e), self._timing_headers(trace))
+
+        elif self.path == '/generate-tools':
+            parsed = self._parse_generation_request()
+            if not parsed:
+                return
+            data, youtube_url, video_id = parsed
+
+            tool_types = self._parse_tools(data.get('tools'))
+            if tool_types is None:
+                return
+
+            cached = {t: result_cache.get(video_id, t) for t in tool_types}
+            missing = [t for t in tool_types if cached[t] is None]
+            if missing and not job_slots.acquire(blocking=False):
+                self._send_text(503, "Server busy, too many generations in progress", {'Retry-After': '10'})
+                return
+
+            try:
+                self._start_ndjson()
+                connected = True
+                for tool_type in tool_types:
+                    if cached[tool_type] is not None:
+                        GENERATIONS.inc(tool_type=tool_type, outcome="cached")
+                        connected = self._write_ndjson({"video_id": video_id, "tool_type": tool_type, "status": "DONE",
+                                                        "data": cached[tool_type], "cached": True}) and connected
+                if missing:
+                    req_headers, req_token = resolve_auth(data)
+                    # Keeps consuming after a disconnect so finished tools still reach the cache
+                    for result in produce_tools(video_id, youtube_url, missing, req_headers, req_token):
+                        if connected:
+                            connected = self._write_ndjson(result)
+            finally:
+                if missing:
+                    job_slots.release()
+
+        elif self.path == '/generate-bulk':
+            try:
+                data = self._read_json()
+            except (TypeError, ValueError):
+                self.send_error(400, "Invalid JSON body")
+                return
+
+            if not valid_auth(data):
+                self.send_error(400, "auth must include cookie and at_token")
+                return
+
+            urls = data.get('youtube_urls')
+            if not isinstance(urls, list) or not urls:
+                self.send_error(400, "Missing youtube_urls")
+                return
+            if len(urls) > BULK_MAX_URLS:
+                self.send_error(400, f"Too many URLs (max {BULK_MAX_URLS})")
+                return
+
+            tool_types = self._parse_tools(data.get('tools', ["infographic"]))
+            if tool_types is None:
+                return
+
+            try:
+                concurrency = int(data.get('concurrency') or BULK_CONCURRENCY)
+            except (TypeError, ValueError):
+                self.send_error(400, "Invalid concurrency")
+                return
+            concurrency = max(1, min(concurrency, BULK_MAX_CONCURRENCY))
+
+            # Repeated videos are generated once
+            seen, unique_urls = set(), []
+            for url in urls:
+                key = extract_video_id(str(url)) or url
+                if key not in seen:
+                    seen.add(key)
+                    unique_urls.append(str(url))
+
+            req_headers, req_token = resolve_auth(data)
+            logger.info("Bulk request: %s videos, tools=%s, concurrency=%s", len(unique_urls), tool_types, concurrency)
+
+            # The response holds this worker until every video is done, like an event stream
+            if not stream_slots.acquire(blocking=False):
+                self._send_text(503, "Too many streaming requests in progress", {'Retry-After': '10'})
+                return
+            try:
+                self._start_ndjson()
+                connected = True
+                # Videos run on the job pool, at most `concurrency` of this request at a time
+                pending_urls = iter(unique_urls)
+                running = set()
+                while True:
+                    for url in itertools.islice(pending_urls, concurrency - len(running)):
+                        running.add(job_manager.run_task(produce_video, url, tool_types, req_headers, req_token))
+                    if not running:
+                        break
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    # Lines are written in completion order; runs continue after a disconnect so results reach the cache
+                    for future in done:
+                        if connected:
+                            connected = self._write_ndjson(future.result())
+            finally:
+                stream_slots.release()
+
+        elif self.path == '/prewarm':
+            parsed = self._parse_generation_request()
+            if not parsed:
+                return
+            data, youtube_url, video_id = parsed
+
+            # Nothing to gain if the result exists or is being generated already
+            if result_cache.get(video_id, "infographic"):
+                self._send_json(200, {"video_id": video_id, "status": "cached"})
+            elif inflight.in_flight((video_id, "infographic")):
+                self._send_json(200, {"video_id": video_id, "status": "generating"})
+            else:
+                req_headers, req_token = resolve_auth(data)
+                self._send_json(202, {"video_id": video_id, **prewarmer.start(video_id, youtube_url, req_headers, req_token)})
+
+        elif self.path == '/jobs':
+            parsed = self._parse_generation_request()
+            if not parsed:
+                return
+            data, youtube_url, video_id = parsed
+            key = (video_id, "infographic")
+
+            cached_url = result_cache.get(video_id, "infographic")
+            if cached_url:
+                GENERATIONS.inc(tool_type="infographic", outcome="cached")
+                job = job_manager.add_finished(key, video_id, "infographic", cached_url)
+            else:
+                req_headers, req_token = resolve_auth(data)
+                profile = self._profile_requested()
+
+                def run(job):
+                    with profiled(video_id, profile):
+                        image_url, _ = produce_infographic(video_id, youtube_url, req_headers, req_token,
+                                                           report=job.report, wait_for_slot=True)
+                    return image_url
+
+                try:
+                    job = job_manager.submit(key, video_id, "infographic", run, youtube_url=youtube_url,
+                                             auth={"headers": req_headers, "at_token": req_token})
+                except OverflowError as e:
+                    self._send_text(503, str(e), {'Retry-After': '10'})
+                    return
+
+            self._send_json(202, {
+                "job_id": job.id,
+                "stage": job.stage,
+                "status_url": f"/jobs/{job.id}",
+                "events_url": f"/jobs/{job.id}/events",
+            })
         else:
             self.send_error(404)
 
-class ReusableTCPServer(socketserver.TCPServer):
+    def do_DELETE(self):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        if len(parts) == 2 and parts[0] == 'prewarm':
+            # Sent when the video's tab is closed or navigates away
+            self._send_json(200, {"video_id": parts[1], "cancelled": prewarmer.cancel(parts[1])})
+        else:
+            self.send_error(404)
+
+    def _stream_job_events(self, job):
+        """Server-sent events: replays the job's stage history, then pushes new stages until it finishes."""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        last_seq = -1
+        try:
+            while True:
+                events = job_manager.wait_for_events(job, last_seq, timeout=SSE_HEARTBEAT)
+                if not events:
+                    # Comment line keeps proxies and the client from timing out
+                    self.wfile.write(b": keep-alive\n\n")
+                for event in events:
+                    last_seq = event["seq"]
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                if events and events[-1]["stage"] in TERMINAL_STAGES:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """
+    HTTP server that hands accepted connections to a fixed pool of worker threads.
+    Connections wait in a bounded queue; when it is full they are answered with 503
+    instead of piling up behind long-running generations.
+    """
     allow_reuse_address = True
 
-print(f"Server starting on port {PORT}...")
-with ReusableTCPServer(("", PORT), RequestHandler) as httpd:
-    print("Serving forever")
-    httpd.serve_forever()
+    def __init__(self, server_address, handler_class, workers: int = WORKERS, queue_size: int = QUEUE_SIZE,
+                 reuse_port: bool = False):
+        # Listen backlog, used by server_activate() inside the base constructor
+        self.request_queue_size = queue_size
+        self.reuse_port = reuse_port
+        self._pending = queue.Queue(maxsize=queue_size)
+        super().__init__(server_address, handler_class)
+
+        self._workers = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker_loop, name=f"http-worker-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def server_bind(self):
+        if self.reuse_port:
+            # Every worker process binds its own socket; the kernel spreads connections across them
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            self._reject(request)
+
+    def _worker_loop(self):
+        while True:
+            request, client_address = self._pending.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b"HTTP/1.0 503 Service Unavailable\r\n"
+                b"Content-Type: text/plain\r\n"
+                b"Access-Control-Allow-Origin: *\r\n"
+                b"Retry-After: 5\r\n"
+                b"\r\n"
+                b"Server busy"
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, show_pid: bool = False):
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        where = "%(process)d/%(threadName)s" if show_pid else "%(threadName)s"
+        handler.setFormatter(logging.Formatter(f"%(asctime)s %(levelname)s %(name)s [{where}] %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+def serve(args, max_jobs: int, processes: int = 1):
+    """Runs one server process: resumes unowned jobs, then serves until killed."""
+    global job_slots
+    job_slots = threading.BoundedSemaphore(max_jobs)
+    # The per-account RPC budget is split between processes
+    client_pool.rpc_rate /= processes
+
+    resumed = job_manager.resume(resume_job)
+    if resumed:
+        logger.info("Resumed %s unfinished job(s) from %s", len(resumed), JOB_DB)
+    with ThreadPoolHTTPServer(("", args.port), RequestHandler, workers=args.workers, queue_size=args.queue_size,
+                              reuse_port=processes > 1) as httpd:
+        logger.info("Serving forever (pid %s)", os.getpid())
+        httpd.serve_forever()
+
+def serve_processes(args, max_jobs: int, processes: int):
+    """
+    Pre-fork mode: `processes` children each run serve() on their own SO_REUSEPORT
+    socket, so request handling and response parsing use several cores. They share
+    state through the job store and the on-disk caches. The parent only supervises:
+    a child that dies is replaced and its unfinished jobs are handed to the new one.
+    """
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                serve(args, max_jobs, processes)
+            except BaseException:
+                logger.exception("Worker process failed")
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+        logger.info("Started worker process %s", pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(processes):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if stopping:
+            continue
+        logger.warning("Worker process %s exited (status %s); restarting it", pid, status)
+        job_manager.store.release(owner=pid)
+        job_manager.store.close()
+        # Avoids a tight fork loop if workers die on startup
+        time.sleep(1)
+        spawn()
+
+def main():
+    global job_manager, stream_slots, MAX_FOLLOWERS, MAX_STREAMS
+    parser = argparse.ArgumentParser(description="NotebookLM infographic backend")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker threads handling connections")
+    parser.add_argument("--max-jobs", type=int, default=MAX_JOBS_SETTING or None,
+                        help="Concurrent generations (default: derived from workers)")
+    parser.add_argument("--max-streams", type=int, default=MAX_STREAMS_SETTING or None,
+                        help="Open event and bulk streams (default: derived from workers)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Accepted connections waiting for a worker")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help="Server processes sharing the port")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR")
+    parser.add_argument("--log-format", default=LOG_FORMAT, choices=["text", "json"])
+    args = parser.parse_args()
+
+    processes = max(1, args.processes)
+    configure_logging(args.log_level, args.log_format, show_pid=processes > 1)
+
+    max_jobs, MAX_FOLLOWERS, MAX_STREAMS = worker_budgets(args.workers, args.max_jobs or 0, args.max_streams or 0)
+    stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+    if processes > 1 and (not JOB_DB or not hasattr(socket, "SO_REUSEPORT")):
+        parser.error("--processes needs SO_REUSEPORT and the job store (NOTEBOOKLM_JOB_DB)")
+    # Its executor starts no threads until the first job, so it is safe to build before forking
+    job_manager = JobManager(max_workers=max_jobs, max_pending=args.queue_size * 4,
+                             store=JobStore(JOB_DB, terminal_stages=TERMINAL_STAGES) if JOB_DB else None)
+
+    logger.info("Server starting on port %s (%s process(es) x %s workers, %s concurrent jobs, %s followers"
+                " and %s streams each)...", args.port, processes, args.workers, max_jobs, MAX_FOLLOWERS, MAX_STREAMS)
+    if job_manager.store is not None:
+        # Nothing is running yet: every unfinished job is up for resuming
+        job_manager.store.release()
+        # Each process opens its own connection on first use; none may cross the fork
+        job_manager.store.close()
+    if processes > 1:
+        serve_processes(args, max_jobs, processes)
+    else:
+        serve(args, max_jobs)
+
+if __name__ == "__main__":
+    main()
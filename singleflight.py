@@ -0,0 +1,69 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the function,
+    later callers block until it finishes and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        # Callers blocked on another caller's run that counted against a max_waiters limit
+        self._limited_waiters = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], max_waiters: Optional[int] = None) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared) where shared is True if the result came from another caller's run.
+        With max_waiters, a caller that would have to wait while that many limited callers
+        (across all keys) are already waiting raises OverflowError instead.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                if max_waiters is not None:
+                    if self._limited_waiters >= max_waiters:
+                        raise OverflowError("Too many requests waiting for in-flight runs")
+                    self._limited_waiters += 1
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            try:
+                call.done.wait()
+            finally:
+                if max_waiters is not None:
+                    with self._lock:
+                        self._limited_waiters -= 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from job_store import JobStore
+from jobs import JobManager, STAGE_DONE, STAGE_QUEUED, TERMINAL_STAGES
+
+
+class _FinishingConnection:
+    """Connection wrapper that runs `finish` just before insert() looks up the conflicting job."""
+
+    def __init__(self, conn, finish):
+        self._conn = conn
+        self._finish = finish
+
+    def execute(self, sql, *args):
+        if self._finish is not None and sql.startswith("SELECT id FROM jobs"):
+            finish, self._finish = self._finish, None
+            finish()
+        return self._conn.execute(sql, *args)
+
+
+class JobStoreInsertRaceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.store = JobStore(self.path, terminal_stages=TERMINAL_STAGES)
+        # Stands in for another server process sharing the file
+        self.other = JobStore(self.path, terminal_stages=TERMINAL_STAGES)
+        self.other.insert("other", "vid", "infographic", STAGE_QUEUED, 1.0)
+
+    def tearDown(self):
+        self.store.close()
+        self.other.close()
+        self.tmp.cleanup()
+
+    def _finish_other_during_insert(self):
+        conn = self.store._connect()
+        wrapped = _FinishingConnection(conn, lambda: self.other.update("other", stage=STAGE_DONE))
+        self.store._connect = lambda: wrapped
+
+    def test_conflict_with_unfinished_job_returns_its_id(self):
+        self.assertEqual(self.store.insert("mine", "vid", "infographic", STAGE_QUEUED, 2.0), "other")
+
+    def test_conflicting_job_finishing_mid_insert_adds_the_job(self):
+        self._finish_other_during_insert()
+        self.assertIsNone(self.store.insert("mine", "vid", "infographic", STAGE_QUEUED, 2.0))
+        self.assertEqual(self.store.get("mine")["stage"], STAGE_QUEUED)
+
+    def test_submit_runs_the_job_when_the_other_finishes_mid_insert(self):
+        self._finish_other_during_insert()
+        manager = JobManager(max_workers=1, store=self.store)
+        job = manager.submit(("vid", "infographic"), "vid", "infographic", lambda job: "url")
+        self.assertNotEqual(job.id, "other")
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.result, "url")
+
+
+class JobManagerSubmitTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.sqlite3"), terminal_stages=TERMINAL_STAGES)
+        self.manager = JobManager(max_workers=1, store=self.store)
+        # Holds every insert until released, like a store contended by another process
+        self.inserting = threading.Event()
+        self.release = threading.Event()
+        self.finish = threading.Event()
+        self.jobs = []
+        insert = self.store.insert
+
+        def slow_insert(*args, **kwargs):
+            self.inserting.set()
+            self.release.wait(5)
+            return insert(*args, **kwargs)
+        self.store.insert = slow_insert
+
+    def tearDown(self):
+        self.release.set()
+        self.finish.set()
+        for job in self.jobs:
+            job.wait(5)
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _submit(self):
+        # The job stays unfinished until the test is done, so later submits must find it
+        self.jobs.append(self.manager.submit(("vid", "infographic"), "vid", "infographic",
+                                             lambda job: self.finish.wait(5) and "url"))
+
+    def test_get_does_not_wait_for_a_store_insert(self):
+        submitter = threading.Thread(target=self._submit)
+        submitter.start()
+        self.assertTrue(self.inserting.wait(5))
+
+        got = []
+        getter = threading.Thread(target=lambda: got.append(self.manager.get("missing")))
+        getter.start()
+        getter.join(1)
+        self.assertFalse(getter.is_alive())
+        self.assertEqual(got, [None])
+
+        self.release.set()
+        submitter.join(5)
+        self.assertEqual(len(self.jobs), 1)
+
+    def test_concurrent_submits_for_one_key_share_the_job(self):
+        submitters = [threading.Thread(target=self._submit) for _ in range(2)]
+        for submitter in submitters:
+            submitter.start()
+        self.assertTrue(self.inserting.wait(5))
+        self.release.set()
+        for submitter in submitters:
+            submitter.join(5)
+        self.assertEqual(len(self.jobs), 2)
+        self.assertIs(self.jobs[0], self.jobs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
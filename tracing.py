@@ -0,0 +1,141 @@
+import contextvars
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spans kept per trace; a long poll adds a few per tick, later ones are only counted
+MAX_SPANS = 500
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+
+# Characters allowed in a Server-Timing metric name (an HTTP token)
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+# Python 3.12+ allows one cProfile profiler per process, so profiles never overlap
+_profile_lock = threading.Lock()
+
+
+class Trace:
+    """
+    Timing spans of one request or job. Each span is {name, start, dur, ...attrs}, with
+    start and dur in milliseconds and start relative to the trace's creation.
+    """
+
+    def __init__(self, spans: Optional[List[Dict]] = None, dropped: int = 0, started_at: Optional[float] = None):
+        self.started_at = started_at or time.time()
+        # Monotonic equivalent of started_at, so a restored trace's new spans continue its timeline
+        self.started = time.monotonic() - (time.time() - self.started_at)
+        self.spans: List[Dict] = list(spans or [])
+        self.dropped = dropped
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, duration: float, **attrs):
+        """Records a span; start is a time.monotonic() value."""
+        entry = {"name": name, "start": round((start - self.started) * 1000, 1),
+                 "dur": round(duration * 1000, 1), **attrs}
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(entry)
+            else:
+                self.dropped += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"started_at": self.started_at, "spans": list(self.spans), "dropped": self.dropped}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "Trace":
+        data = data or {}
+        return cls(data.get("spans"), data.get("dropped", 0), data.get("started_at"))
+
+    def totals(self) -> Dict[str, List[float]]:
+        """{name: [count, total ms]} in first-seen order."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for entry in self.spans:
+                total = totals.setdefault(entry["name"], [0, 0.0])
+                total[0] += 1
+                total[1] += entry["dur"]
+        return totals
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: one metric per span name (repeated spans summed, their
+        count as desc), then `total` for the time since the trace started.
+        """
+        metrics = []
+        for name, (count, total) in self.totals().items():
+            metric = f"{_TOKEN_RE.sub('_', name)};dur={total:.1f}"
+            if count > 1:
+                metric += f';desc="{count}x"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={(time.monotonic() - self.started) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: Trace) -> Iterator[Trace]:
+    """Makes trace the one spans are recorded to in this thread (or task) for the with-block."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, start: float, duration: float, **attrs):
+    """Adds a span to the active trace, if any. start is a time.monotonic() value."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start, duration, **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[None]:
+    """Times the with-block as a span of the active trace. A no-op without one."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.monotonic() - start, **attrs)
+
+
+@contextmanager
+def profile_to(directory: str, label: str) -> Iterator[Optional[str]]:
+    """
+    Runs the with-block under cProfile (this thread only) and writes the stats to a
+    .prof file in directory, whose path is yielded. Read it with pstats or snakeviz.
+    While another profile is running the block runs unprofiled and None is yielded.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        logger.info("Profiler busy, not profiling %s", label)
+        yield None
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{_TOKEN_RE.sub('_', label)}-{os.getpid()}.prof")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            logger.info("Wrote profile of %s to %s", label, path)
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,38 @@
+import re
+import urllib.parse
+from typing import Optional
+
+_VIDEO_ID_RE = re.compile(r'[A-Za-z0-9_-]{11}')
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Normalizes any YouTube URL form (watch, youtu.be, shorts, embed, live, mobile)
+    to its 11-character video ID. Returns None if no valid ID is found.
+    """
+    if not url:
+        return None
+    if _VIDEO_ID_RE.fullmatch(url):
+        return url
+
+    try:
+        u = urllib.parse.urlparse(url.strip())
+    except ValueError:
+        return None
+
+    host = (u.hostname or "").lower()
+    candidate = None
+    if host.endswith("youtu.be"):
+        candidate = u.path.lstrip('/').split('/')[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        query = urllib.parse.parse_qs(u.query)
+        if query.get('v'):
+            candidate = query['v'][0]
+        else:
+            parts = [p for p in u.path.split('/') if p]
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+
+    if candidate and _VIDEO_ID_RE.fullmatch(candidate):
+        return candidate
+    return None